@@ -0,0 +1,27 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Сводка медленных запросов: сверху те, что отняли больше всего
+    времени в сумме.
+    """
+    list_display = (
+        'statement', 'view', 'calls', 'total_time', 'mean', 'max_time',
+        'last_seen',
+    )
+    list_filter = ('view',)
+    search_fields = ('statement',)
+    readonly_fields = (
+        'fingerprint', 'view', 'statement', 'plan', 'calls', 'total_time',
+        'max_time', 'last_seen',
+    )
+
+    def mean(self, obj):
+        return round(obj.mean_time, 3)
+    mean.short_description = 'В среднем, с'
+
+    def has_add_permission(self, request):
+        return False
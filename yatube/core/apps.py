@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .replicas import install_counter
+        from .sqlite import apply_pragmas
+        from .slow_queries import install_recorder
+        from .timing import install_timer
+        connection_created.connect(install_counter)
+        connection_created.connect(install_timer)
+        connection_created.connect(install_recorder)
+        connection_created.connect(apply_pragmas)
@@ -0,0 +1,341 @@
+import http.client
+import math
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from fnmatch import fnmatch
+from importlib import import_module
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode, urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post
+
+from .replicas import query_counts
+from .stampede import FRAGMENTS
+
+User = get_user_model()
+
+APPS = ('posts', 'users', 'about')
+# Маршруты, которые меняют данные или сессию даже на GET.
+UNSAFE = ('users:logout', 'posts:profile_follow', 'posts:profile_unfollow')
+BENCHMARK_USER = 'http_benchmark'
+# Рост p95 и падение пропускной способности меньше этой доли
+# считаются шумом; рост числа запросов к базе — всегда регрессия.
+THRESHOLD = 0.2
+# Кэш только этого процесса: замеры с холодным кэшем очищают его,
+# а не общий кэш приложения.
+LOCAL_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+    FRAGMENTS: {
+        'BACKEND': 'core.stampede.StampedeCache',
+        'LOCATION': 'default',
+    },
+}
+
+
+def routes(apps=APPS):
+    """Имена маршрутов приложений и аргументы, которые им нужны."""
+    for app in apps:
+        module = import_module(f'{app}.urls')
+        for pattern in module.urlpatterns:
+            yield (
+                f'{module.app_name}:{pattern.name}',
+                sorted(pattern.pattern.converters),
+            )
+
+
+def samples():
+    """Значения аргументов маршрутов из данных в базе."""
+    post = Post.objects.select_related('author').first()
+    if post is None:
+        return {}
+    grouped = Post.objects.filter(group__isnull=False).select_related(
+        'group'
+    ).first()
+    return {
+        'post_id': post.pk,
+        'username': post.author.username,
+        'slug': grouped.group.slug if grouped else None,
+        'q': post.text.split()[0],
+    }
+
+
+# Параметры строки запроса, без которых страница пустая.
+QUERIES = {
+    'posts:search': ('q',),
+}
+
+
+def plan(names=None, exclude=UNSAFE):
+    """Адреса для замера и пропущенные маршруты с причиной."""
+    values = samples()
+    planned, skipped = [], []
+    for name, arguments in routes():
+        if names and not any(fnmatch(name, pattern) for pattern in names):
+            continue
+        if any(fnmatch(name, pattern) for pattern in exclude):
+            skipped.append((name, 'исключён'))
+            continue
+        kwargs = {argument: values.get(argument) for argument in arguments}
+        query = {key: values.get(key) for key in QUERIES.get(name, ())}
+        if None in kwargs.values() or None in query.values():
+            skipped.append((name, 'нет данных для аргументов'))
+            continue
+        url = reverse(name, kwargs=kwargs)
+        if query:
+            url += '?' + urlencode(query)
+        planned.append((name, url))
+    return planned, skipped
+
+
+@contextmanager
+def benchmark_user():
+    """Пользователь, от имени которого идут запросы.
+
+    Он сотрудник, чтобы страницы вроде выгрузки чужого профиля
+    отвечали содержимым, а не перенаправлением. Чтобы не выдать права
+    существующему аккаунту, на каждый прогон создаётся новый
+    пользователь без пароля, а после прогона он удаляется.
+    """
+    user = User.objects.create_user(
+        username=f'{BENCHMARK_USER}_{uuid.uuid4().hex[:12]}', is_staff=True
+    )
+    try:
+        yield user
+    finally:
+        user.delete()
+
+
+def percentile(values, share):
+    """Значение, не меньше которого доля share всех значений."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def total_queries():
+    return sum(query_counts().values())
+
+
+def summarize(latencies, statuses, queries, wall):
+    count = len(latencies)
+    milliseconds = [latency * 1000 for latency in latencies]
+    return {
+        'requests': count,
+        'statuses': {
+            str(status): total for status, total in sorted(statuses.items())
+        },
+        'rps': count / wall if wall else 0.0,
+        'mean': sum(milliseconds) / count if count else None,
+        'p50': percentile(milliseconds, 0.5),
+        'p95': percentile(milliseconds, 0.95),
+        'p99': percentile(milliseconds, 0.99),
+        'queries': (
+            queries / count if count and queries is not None else None
+        ),
+    }
+
+
+def measure_client(url, requests, warmup=0, user=None, cold=False):
+    """Последовательные запросы через тестовый клиент в этом процессе."""
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    for _ in range(warmup):
+        client.get(url).getvalue()
+    latencies, statuses = [], Counter()
+    queries = total_queries()
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold:
+            cache.clear()
+        begin = time.perf_counter()
+        response = client.get(url)
+        response.getvalue()
+        latencies.append(time.perf_counter() - begin)
+        statuses[response.status_code] += 1
+    wall = time.perf_counter() - started
+    return summarize(latencies, statuses, total_queries() - queries, wall)
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def wsgi_server():
+    """Многопоточный WSGI-сервер приложения на свободном порту."""
+    server = make_server(
+        '127.0.0.1', 0, get_wsgi_application(), _Server, _QuietHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    name = settings.SESSION_COOKIE_NAME
+    return f'{name}={client.cookies[name].value}'
+
+
+class _HttpLoad:
+    """Потоки, разбирающие общий запас запросов к одному адресу."""
+
+    def __init__(self, base_url, url, headers):
+        parts = urlsplit(base_url)
+        self.address = (parts.hostname, parts.port)
+        self.url = url
+        self.headers = headers
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = Counter()
+
+    def take(self):
+        with self.lock:
+            if not self.remaining:
+                return False
+            self.remaining -= 1
+            return True
+
+    def request(self, connection):
+        try:
+            connection.request('GET', self.url, headers=self.headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except OSError:
+            connection.close()
+            return 'error'
+
+    def worker(self, record):
+        connection = http.client.HTTPConnection(*self.address, timeout=30)
+        try:
+            while self.take():
+                begin = time.perf_counter()
+                status = self.request(connection)
+                if record:
+                    with self.lock:
+                        self.latencies.append(time.perf_counter() - begin)
+                        self.statuses[status] += 1
+        finally:
+            connection.close()
+
+    def run(self, requests, concurrency, record=True):
+        self.remaining = requests
+        threads = [
+            threading.Thread(target=self.worker, args=(record,))
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def measure_http(base_url, url, requests, concurrency=1, warmup=0,
+                 cookie=None, count_queries=True):
+    """Запросы по HTTP из concurrency потоков одновременно.
+
+    Число запросов к базе известно, только если сервер работает
+    в этом же процессе.
+    """
+    load = _HttpLoad(base_url, url, {'Cookie': cookie} if cookie else {})
+    load.run(warmup, concurrency, record=False)
+    queries = total_queries()
+    started = time.perf_counter()
+    load.run(requests, concurrency)
+    wall = time.perf_counter() - started
+    queries = total_queries() - queries if count_queries else None
+    return summarize(load.latencies, load.statuses, queries, wall)
+
+
+def run(planned, mode='client', requests=50, warmup=5, concurrency=4,
+        user=None, cold=False, base_url=None):
+    """Замеряет все адреса и возвращает результат для сохранения в JSON.
+
+    С cold приложение в этом процессе работает с LOCAL_CACHE, который
+    очищается перед замерами; кэш внешнего сервера base_url так не
+    очистить, поэтому вместе они не используются.
+    """
+    if cold and base_url is not None:
+        raise ValueError('Холодный кэш недоступен для внешнего сервера')
+    with override_settings(CACHES=LOCAL_CACHE) if cold else nullcontext():
+        return _run(
+            planned, mode, requests, warmup, concurrency, user, cold,
+            base_url,
+        )
+
+
+def _run(planned, mode, requests, warmup, concurrency, user, cold,
+         base_url):
+    results = {
+        'created': timezone.now().isoformat(),
+        'mode': mode,
+        'requests': requests,
+        'concurrency': concurrency if mode == 'wsgi' else 1,
+        'routes': {},
+    }
+    if mode == 'client':
+        for name, url in planned:
+            results['routes'][name] = dict(url=url, **measure_client(
+                url, requests, warmup, user, cold
+            ))
+        return results
+    cookie = session_cookie(user) if user is not None else None
+    server = wsgi_server() if base_url is None else None
+    with server or nullcontext(base_url) as url_base:
+        for name, url in planned:
+            if cold:
+                cache.clear()
+            results['routes'][name] = dict(url=url, **measure_http(
+                url_base, url, requests, concurrency, warmup, cookie,
+                count_queries=server is not None,
+            ))
+    return results
+
+
+def compare(previous, current, threshold=THRESHOLD):
+    """Регрессии текущего прогона относительно предыдущего:
+    список (маршрут, метрика, было, стало).
+    """
+    regressions = []
+    for name, now in current['routes'].items():
+        before = previous.get('routes', {}).get(name)
+        if before is None:
+            continue
+        checks = (
+            ('p95', lambda old, new: new > old * (1 + threshold)),
+            ('rps', lambda old, new: new < old * (1 - threshold)),
+            ('queries', lambda old, new: new > old),
+        )
+        for metric, worse in checks:
+            old, new = before.get(metric), now.get(metric)
+            if old is not None and new is not None and worse(old, new):
+                regressions.append((name, metric, old, new))
+    return regressions
@@ -0,0 +1,306 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.core.cache.backends import filebased
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.files import locks
+from django.utils.module_loading import import_string
+
+from . import timing
+from .lru import LRU
+
+GENERATION_KEY = 'two_tier_generation'
+
+# Состояние общее для всех потоков процесса: Django создаёт экземпляр
+# бэкенда на каждый поток, а локальный уровень должен быть один.
+_processes = {}
+_processes_lock = threading.Lock()
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Файловый кэш с атомарными add() и incr(): на нём можно строить
+    блокировки и счётчики поколений.
+
+    Стандартный add() проверяет ключ и затем пишет его, и два процесса
+    могут одновременно решить, что ключа нет. Здесь файл публикуется
+    через os.link(), который не перезаписывает существующий.
+
+    Стандартный incr() — это get() и set() со сроком по умолчанию: он
+    теряет одновременные увеличения и срок хранения ключа.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            try:
+                os.link(tmp_path, fname)
+            except FileExistsError:
+                return False
+            return True
+        finally:
+            os.remove(tmp_path)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        while True:
+            try:
+                f = open(fname, 'rb')
+            except FileNotFoundError:
+                raise ValueError("Key '%s' not found" % key)
+            with f:
+                locks.lock(f, locks.LOCK_EX)
+                try:
+                    if not self._is_current(f, fname):
+                        # Пока ждали блокировку, файл заменили: значение
+                        # читается заново из нового файла.
+                        continue
+                    expiry = pickle.load(f)
+                    if expiry is not None and expiry < time.time():
+                        raise ValueError("Key '%s' not found" % key)
+                    value = pickle.loads(zlib.decompress(f.read())) + delta
+                    self._replace(fname, expiry, value)
+                    return value
+                finally:
+                    locks.unlock(f)
+
+    def _is_current(self, f, fname):
+        try:
+            return os.path.samestat(os.fstat(f.fileno()), os.stat(fname))
+        except FileNotFoundError:
+            return False
+
+    def _replace(self, fname, expiry, value):
+        """Записывает значение с прежним сроком хранения."""
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                f.write(pickle.dumps(expiry, self.pickle_protocol))
+                f.write(
+                    zlib.compress(pickle.dumps(value, self.pickle_protocol))
+                )
+            os.replace(tmp_path, fname)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class _Local:
+    def __init__(self, size, timeout):
+        self.lru = LRU(size, timeout)
+        # Ключи, которых не оказалось в общем кэше: set() после такого
+        # промаха — заполнение, а не изменение, и не сбрасывает уровни
+        # других процессов.
+        self.misses = LRU(size, timeout)
+        self.generation = None
+        self.checked = 0.0
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Небольшой LRU процесса перед общим бэкендом.
+
+    Любое изменение уже существующего ключа увеличивает общее поколение;
+    процессы сверяют его не чаще раза в GENERATION_INTERVAL секунд
+    и при расхождении сбрасывают свой LRU. Поэтому чужие изменения видны
+    с задержкой не больше этого интервала, а свои — сразу. add() нового
+    ключа, как и заполнение после промаха, поколение не трогает.
+
+    OPTIONS: SHARED_BACKEND (путь к классу общего бэкенда, LOCATION
+    передаётся ему), LRU_SIZE, LRU_TIMEOUT, GENERATION_INTERVAL;
+    остальные опции достаются общему бэкенду.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        shared_backend = options.pop(
+            'SHARED_BACKEND', 'core.cache.FileBasedCache'
+        )
+        size = options.pop('LRU_SIZE', 1000)
+        lru_timeout = options.pop('LRU_TIMEOUT', 5)
+        self.interval = options.pop('GENERATION_INTERVAL', 1.0)
+        params = dict(params, OPTIONS=options)
+        super().__init__(params)
+        self.shared = import_string(shared_backend)(location, params)
+        with _processes_lock:
+            self.local = _processes.setdefault(
+                location, _Local(size, lru_timeout)
+            )
+
+    # Поколения.
+
+    def _check_generation(self):
+        local = self.local
+        now = time.monotonic()
+        if now - local.checked < self.interval:
+            return
+        generation = self.shared.get(GENERATION_KEY)
+        if generation is None:
+            generation = time.time_ns()
+            if not self.shared.add(GENERATION_KEY, generation, None):
+                generation = self.shared.get(GENERATION_KEY, generation)
+        with local.lock:
+            if generation != local.generation:
+                local.lru.clear()
+                local.generation = generation
+            local.checked = now
+
+    def _bump_generation(self):
+        local = self.local
+        try:
+            generation = self.shared.incr(GENERATION_KEY)
+        except ValueError:
+            generation = time.time_ns()
+            self.shared.set(GENERATION_KEY, generation, None)
+        with local.lock:
+            if local.generation is None or generation != local.generation + 1:
+                # Между проверками поколение меняли другие процессы.
+                local.lru.clear()
+            local.generation = generation
+            local.checked = time.monotonic()
+
+    # Локальный уровень.
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is not None and timeout <= 0:
+            self.local.lru.delete(key)
+            return
+        self.local.lru.set(
+            key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), timeout
+        )
+
+    def _local_get(self, key):
+        data = self.local.lru.get(key)
+        if data is None:
+            self.local.stats['local_misses'] += 1
+            return None, False
+        self.local.stats['local_hits'] += 1
+        return pickle.loads(data), True
+
+    def stats(self):
+        """Попадания и промахи по уровням и размер LRU процесса."""
+        return dict(self.local.stats, local_size=len(self.local.lru))
+
+    # API кэша Django.
+
+    def get(self, key, default=None, version=None):
+        with timing.measure('cache'):
+            return self._get(key, default, version)
+
+    def _get(self, key, default, version):
+        self._check_generation()
+        local_key = self.make_key(key, version)
+        value, found = self._local_get(local_key)
+        if found:
+            timing.incr('cache_hits')
+            return value
+        value = self.shared.get(key, self, version)
+        if value is self:
+            self.local.stats['shared_misses'] += 1
+            timing.incr('cache_misses')
+            self.local.misses.set(local_key, True)
+            return default
+        self.local.stats['shared_hits'] += 1
+        timing.incr('cache_hits')
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with timing.measure('cache'):
+            found = self._get_many(keys, version)
+        timing.incr('cache_hits', len(found))
+        timing.incr('cache_misses', len(keys) - len(found))
+        return found
+
+    def _get_many(self, keys, version):
+        self._check_generation()
+        found, missing = {}, []
+        for key in keys:
+            value, hit = self._local_get(self.make_key(key, version))
+            if hit:
+                found[key] = value
+            else:
+                missing.append(key)
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            self.local.stats['shared_hits'] += len(shared)
+            self.local.stats['shared_misses'] += len(missing) - len(shared)
+            for key in missing:
+                local_key = self.make_key(key, version)
+                if key in shared:
+                    self._remember(local_key, shared[key])
+                else:
+                    self.local.misses.set(local_key, True)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with timing.measure('cache'):
+            self._set(key, value, timeout, version)
+
+    def _set(self, key, value, timeout, version):
+        local_key = self.make_key(key, version)
+        self.shared.set(key, value, timeout, version)
+        if self.local.misses.pop(local_key) is None:
+            self._bump_generation()
+        self._remember(local_key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            local_key = self.make_key(key, version)
+            self.local.misses.delete(local_key)
+            self._remember(local_key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self._bump_generation()
+        self._remember(self.make_key(key, version), value)
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version)
+        self.local.lru.delete(self.make_key(key, version))
+        self._bump_generation()
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version)
+        for key in keys:
+            self.local.lru.delete(self.make_key(key, version))
+        self._bump_generation()
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def clear(self):
+        self.shared.clear()
+        self.local.lru.clear()
+        self.local.misses.clear()
+        self._bump_generation()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
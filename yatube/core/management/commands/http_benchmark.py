@@ -0,0 +1,124 @@
+import json
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+def number(value, pattern='{:.1f}'):
+    return '—' if value is None else pattern.format(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки, пропускную способность и число запросов '
+        'к базе для маршрутов posts, users и about.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'routes', nargs='*',
+            help='Имена маршрутов или шаблоны вроде posts:api_*.'
+        )
+        parser.add_argument(
+            '--mode', choices=('client', 'wsgi'), default='client',
+            help='client — тестовый клиент в этом процессе, wsgi — '
+                 'HTTP-сервер и параллельные потоки.'
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--exclude', nargs='*', default=list(benchmark.UNSAFE)
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Не входить под временным пользователем-сотрудником.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Работать с собственным кэшем процесса и очищать его '
+                 'перед каждым запросом (в режиме wsgi — перед каждым '
+                 'маршрутом); общий кэш не затрагивается.'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Адрес уже запущенного сервера для режима wsgi.'
+        )
+        parser.add_argument('--output', help='Куда сохранить результат.')
+        parser.add_argument(
+            '--compare', help='Прошлый результат для поиска регрессий.'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=benchmark.THRESHOLD
+        )
+
+    def handle(self, *args, **options):
+        planned, skipped = benchmark.plan(
+            options['routes'], options['exclude']
+        )
+        for name, reason in skipped:
+            self.stderr.write(f'{name}: пропущен, {reason}')
+        if not planned:
+            raise CommandError(
+                'Нечего замерять: нет подходящих маршрутов или данных '
+                '(заполнить базу можно командой seed_dataset)'
+            )
+        if options['cold'] and options['base_url']:
+            raise CommandError(
+                '--cold очищает только кэш этого процесса и несовместим '
+                'с --base-url'
+            )
+        login = (
+            nullcontext() if options['anonymous']
+            else benchmark.benchmark_user()
+        )
+        with login as user:
+            results = benchmark.run(
+                planned, options['mode'], options['requests'],
+                options['warmup'], options['concurrency'], user,
+                options['cold'], options['base_url'],
+            )
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                previous = json.load(stream)
+            for key in ('mode', 'concurrency'):
+                if previous.get(key) != results[key]:
+                    raise CommandError(
+                        f'Прогоны несравнимы: {key} {previous.get(key)} '
+                        f'и {results[key]}'
+                    )
+            regressions = benchmark.compare(
+                previous, results, options['threshold']
+            )
+            for name, metric, old, new in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: {metric} {number(old, "{:.2f}")} → '
+                    f'{number(new, "{:.2f}")}'
+                ))
+            if regressions:
+                raise CommandError(f'Регрессий: {len(regressions)}')
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"маршрут":<28} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"зап/с":>8} {"SQL":>6}  статусы'
+        )
+        for name, row in results['routes'].items():
+            statuses = ' '.join(
+                f'{status}×{total}'
+                for status, total in row['statuses'].items()
+            )
+            columns = ' '.join(
+                f'{number(row[metric]):>8}'
+                for metric in ('p50', 'p95', 'p99', 'rps')
+            )
+            self.stdout.write(
+                f'{name:<28} {columns} {number(row["queries"]):>6}  '
+                f'{statuses}'
+            )
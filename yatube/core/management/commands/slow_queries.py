@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает медленные запросы с планами, начиная с отнявших '
+        'больше всего времени.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--view', help='Только для этого представления.')
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить сводку.'
+        )
+
+    def handle(self, *args, **options):
+        queries = SlowQuery.objects.all()
+        if options['view']:
+            queries = queries.filter(view=options['view'])
+        if options['clear']:
+            deleted, _ = queries.delete()
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено записей: {deleted}'
+            ))
+            return
+        rows = list(queries[:options['limit']])
+        if not rows:
+            self.stdout.write('Медленных запросов нет')
+            return
+        for rank, query in enumerate(rows, 1):
+            self.stdout.write(self.style.WARNING(
+                f'{rank}. {query.view}: всего {query.total_time:.3f} с, '
+                f'вызовов {query.calls}, в среднем {query.mean_time:.3f} с, '
+                f'максимум {query.max_time:.3f} с'
+            ))
+            self.stdout.write(f'    {query.statement}')
+            for step in query.plan.splitlines():
+                self.stdout.write(f'        {step}')
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.benchmark import LOCAL_CACHE
+from posts.models import Post
+
+User = get_user_model()
+
+# Исходная конфигурация Django и настроенная из SQLITE_PRAGMAS.
+# journal_mode хранится в файле, поэтому откат к DELETE задаётся явно.
+PROFILES = {
+    'stock': {'journal_mode': 'delete', 'synchronous': 'full'},
+    'tuned': None,
+}
+
+
+def run_worker(task):
+    """Гоняет запросы одного вида до истечения времени."""
+    role, post_id, user_id, seconds = task
+    client = Client()
+    client.force_login(User.objects.get(pk=user_id))
+    read_urls = [
+        reverse('posts:index'),
+        reverse('posts:post_detail', kwargs={'post_id': post_id}),
+    ]
+    comment_url = reverse('posts:add_comment', kwargs={'post_id': post_id})
+    done = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if role == 'read':
+                # Замеряем базу, а не кэш фрагментов.
+                cache.clear()
+                client.get(read_urls[done % 2])
+            else:
+                client.post(comment_url, {'text': f'Комментарий {done}'})
+            done += 1
+        except OperationalError:
+            errors += 1
+    connections.close_all()
+    return role, done, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность лент и комментариев '
+        'с исходными и настроенными прагмами SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument(
+            '--posts', type=int, default=200,
+            help='Сколько постов должно быть в копии базы.'
+        )
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан только на SQLite')
+        original = source.settings_dict['NAME']
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for profile, pragmas in PROFILES.items():
+                    path = os.path.join(directory, f'{profile}.sqlite3')
+                    self.copy(original, path)
+                    # Свой кэш в каждом процессе: читатели очищают его
+                    # перед запросом, общий кэш приложения не трогаем.
+                    overrides = {'CACHES': LOCAL_CACHE}
+                    if pragmas is not None:
+                        overrides['SQLITE_PRAGMAS'] = pragmas
+                    with override_settings(**overrides):
+                        self.run_profile(profile, path, options)
+        finally:
+            connections.close_all()
+            source.settings_dict['NAME'] = original
+
+    def copy(self, original, path):
+        connections.close_all()
+        source = sqlite3.connect(original)
+        target = sqlite3.connect(path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+    def run_profile(self, profile, path, options):
+        connections['default'].settings_dict['NAME'] = path
+        connections.close_all()
+        post_id, user_id = self.prepare(options['posts'])
+        connections.close_all()
+        tasks = [
+            ('read', post_id, user_id, options['seconds'])
+        ] * options['readers'] + [
+            ('write', post_id, user_id, options['seconds'])
+        ] * options['writers']
+        context = multiprocessing.get_context('fork')
+        with context.Pool(len(tasks)) as pool:
+            results = pool.map(run_worker, tasks)
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for role, done, errors in results:
+            totals[role][0] += done
+            totals[role][1] += errors
+        seconds = options['seconds']
+        self.stdout.write(
+            f'{profile}: чтений {totals["read"][0] / seconds:.1f}/с, '
+            f'записей {totals["write"][0] / seconds:.1f}/с, '
+            f'ошибок блокировки {totals["read"][1] + totals["write"][1]}'
+        )
+
+    def prepare(self, posts):
+        user, _ = User.objects.get_or_create(username='sqlite_benchmark')
+        missing = posts - Post.objects.count()
+        if missing > 0:
+            Post.objects.bulk_create(
+                Post(author=user, text=f'Пост {i}') for i in range(missing)
+            )
+        post = Post.objects.order_by('-pub_date').first()
+        return post.pk, user.pk
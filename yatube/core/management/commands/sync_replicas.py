@@ -0,0 +1,24 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в файлы реплик из DATABASE_REPLICAS.'
+
+    def handle(self, *args, **options):
+        source = connections['default']
+        if source.vendor != 'sqlite':
+            raise CommandError('Копирование реплик доступно только для SQLite')
+        source.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            name = settings.DATABASES[alias]['NAME']
+            connections[alias].close()
+            target = sqlite3.connect(name)
+            try:
+                source.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: {name}')
@@ -0,0 +1,312 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.files import locks
+
+from . import replicas
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# Для запросов, не дошедших до представления (404 на неизвестный
+# адрес): путь в метке раздул бы число рядов.
+UNRESOLVED = '<unresolved>'
+# Метод приходит от клиента: любые другие значения сводятся к одному,
+# иначе произвольные строки плодили бы ряды.
+METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS',
+))
+OTHER_METHOD = 'OTHER'
+# Сумма значений завершившихся процессов.
+ARCHIVE = 'archive.json'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        return json.dumps(
+            [self.name, [str(labels[name]) for name in self.labelnames]],
+            ensure_ascii=False,
+        )
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, value=1, **labels):
+        with self.registry.lock:
+            values = self.registry.values
+            key = self.key(labels)
+            values[key] = values.get(key, 0) + value
+
+    def merge(self, old, new):
+        return old + new
+
+    def samples(self, labels, value):
+        yield self.name, labels, value
+
+
+class Histogram(Metric):
+    """Гистограмма с постоянными границами корзин.
+
+    Хранятся некумулятивные счётчики корзин (последняя — +Inf) и сумма.
+    """
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames, buckets):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        with self.registry.lock:
+            values = self.registry.values
+            key = self.key(labels)
+            counts = values.get(key)
+            if counts is None:
+                counts = values[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def merge(self, old, new):
+        if len(old) != len(new):
+            # Границы поменялись между выкладками: старые данные
+            # несовместимы с новыми.
+            return new
+        return [a + b for a, b in zip(old, new)]
+
+    def samples(self, labels, counts):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            total += count
+            le = bound if bound == '+Inf' else format_value(bound)
+            yield self.name + '_bucket', labels + [('le', le)], total
+        yield self.name + '_sum', labels, counts[-1]
+        yield self.name + '_count', labels, total
+
+
+def _write(path, data):
+    """Заменяет файл целиком: читатель не увидит его недописанным."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with open(fd, 'w', encoding='utf-8') as stream:
+        stream.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Метрики процесса, которые сбрасываются в METRICS_DIR/<pid>-<id>.json.
+
+    Каждый воркер пишет только свой файл, поэтому блокировки между
+    процессами на запись не нужны; при выводе файлы всех процессов
+    суммируются. Случайный id в имени не даёт новому процессу с тем же
+    pid затереть файл завершившегося. Файлы завершившихся процессов
+    при выводе прибавляются к ARCHIVE и удаляются: счётчики Prometheus
+    не уменьшаются после перезапуска воркера, а файлов не становится
+    всё больше.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.reset()
+        if hasattr(os, 'register_at_fork'):
+            # Иначе воркер, созданный fork(), записал бы в свой файл
+            # ещё раз значения, накопленные родителем.
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.values = {}
+        self.flushed = time.monotonic()
+        self.name = f'{os.getpid()}-{uuid.uuid4().hex}.json'
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=()):
+        return self.register(
+            Histogram(self, name, documentation, labelnames, buckets)
+        )
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def path(self):
+        return os.path.join(settings.METRICS_DIR, self.name)
+
+    def flush(self, force=False):
+        """Записывает значения процесса не чаще METRICS_FLUSH_INTERVAL."""
+        now = time.monotonic()
+        if not force and now - self.flushed < settings.METRICS_FLUSH_INTERVAL:
+            return
+        with self.lock:
+            data = json.dumps(self.values)
+            self.flushed = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _write(self.path(), data)
+
+    def merge(self, merged, values):
+        """Прибавляет values к merged; метрики, которых больше нет,
+        пропускаются.
+        """
+        for key, value in values.items():
+            name, _ = json.loads(key)
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            if key in merged:
+                value = metric.merge(merged[key], value)
+            merged[key] = value
+        return merged
+
+    def collect(self):
+        """Значения всех процессов, сложенные по ключам."""
+        self.flush(force=True)
+        # Вывод и перенос файлов в архив идут под одной блокировкой:
+        # иначе параллельный вывод мог бы не увидеть значения файла,
+        # уже удалённого, но ещё не записанного в архив.
+        with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                self.compact()
+                merged = {}
+                pattern = os.path.join(settings.METRICS_DIR, '*.json')
+                for path in sorted(glob.glob(pattern)):
+                    self.merge(merged, _read(path) or {})
+                return merged
+            finally:
+                locks.unlock(lock)
+
+    def compact(self):
+        """Переносит значения завершившихся процессов в ARCHIVE."""
+        archive = os.path.join(settings.METRICS_DIR, ARCHIVE)
+        dead = []
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            pid = os.path.basename(path).split('-')[0]
+            if pid.isdigit() and not _is_alive(int(pid)):
+                dead.append(path)
+        if not dead:
+            return
+        merged = self.merge({}, _read(archive) or {})
+        for path in dead:
+            self.merge(merged, _read(path) or {})
+        _write(archive, json.dumps(merged))
+        for path in dead:
+            os.remove(path)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        grouped = {}
+        for key, value in self.collect().items():
+            name, labels = json.loads(key)
+            grouped.setdefault(name, []).append((labels, value))
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(grouped.get(name, [])):
+                pairs = list(zip(metric.labelnames, labels))
+                for sample, sample_labels, number in metric.samples(
+                    pairs, value
+                ):
+                    lines.append(
+                        f'{sample}{format_labels(sample_labels)} '
+                        f'{format_value(number)}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return (
+        value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+    )
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{escape(str(value))}"' for name, value in pairs
+    ) + '}'
+
+
+def format_value(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'yatube_http_requests_total',
+    'Запросы по представлениям, методам и кодам ответа.',
+    ('view', 'method', 'status'),
+)
+LATENCY = registry.histogram(
+    'yatube_http_request_duration_seconds',
+    'Время ответа представления.',
+    ('view',), LATENCY_BUCKETS,
+)
+QUERIES = registry.histogram(
+    'yatube_http_request_queries',
+    'Запросов к базе на один запрос к сайту.',
+    ('view',), QUERY_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """Записывает время, код ответа и число запросов к базе по имени
+    представления, например posts:index.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = replicas.thread_queries()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else UNRESOLVED
+        method = request.method if request.method in METHODS else (
+            OTHER_METHOD
+        )
+        REQUESTS.inc(view=view, method=method, status=response.status_code)
+        LATENCY.observe(elapsed, view=view)
+        QUERIES.observe(replicas.thread_queries() - queries, view=view)
+        registry.flush()
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, verbose_name='Отпечаток')),
+                ('view', models.CharField(max_length=200, verbose_name='Представление')),
+                ('statement', models.TextField(verbose_name='Запрос без значений')),
+                ('plan', models.TextField(blank=True, verbose_name='План')),
+                ('calls', models.PositiveIntegerField(default=0, verbose_name='Вызовов')),
+                ('total_time', models.FloatField(default=0, verbose_name='Всего, с')),
+                ('max_time', models.FloatField(default=0, verbose_name='Максимум, с')),
+                ('last_seen', models.DateTimeField(verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'Медленный запрос',
+                'verbose_name_plural': 'Медленные запросы',
+                'ordering': ['-total_time'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slowquery',
+            constraint=models.UniqueConstraint(fields=('fingerprint', 'view'), name='unique_slow_query'),
+        ),
+    ]
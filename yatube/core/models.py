@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class SlowQuery(models.Model):
+    """Медленные запросы одного вида из одного представления."""
+    fingerprint = models.CharField('Отпечаток', max_length=32)
+    view = models.CharField('Представление', max_length=200)
+    statement = models.TextField('Запрос без значений')
+    plan = models.TextField('План', blank=True)
+    calls = models.PositiveIntegerField('Вызовов', default=0)
+    total_time = models.FloatField('Всего, с', default=0)
+    max_time = models.FloatField('Максимум, с', default=0)
+    last_seen = models.DateTimeField('Последний раз')
+
+    class Meta:
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+        ordering = ['-total_time']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fingerprint', 'view'],
+                name='unique_slow_query'
+            ),
+        ]
+
+    def __str__(self):
+        return self.statement[:100]
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.calls if self.calls else 0
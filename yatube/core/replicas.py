@@ -0,0 +1,136 @@
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def _reset():
+    _state.replica = None
+    _state.wrote = False
+
+
+class ReplicaRouter:
+    """Чтение моделей REPLICA_APPS в представлениях с @replica_reads
+    уходит на реплику, всё остальное — на основную базу.
+
+    После первой записи в запросе чтения возвращаются на основную базу,
+    чтобы пользователь сразу видел то, что только что сохранил.
+    """
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'wrote', False):
+            return 'default'
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            # Сессии и пользователи читаются с основной базы: отставшая
+            # реплика не должна разлогинивать только что вошедших.
+            return None
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def replica_reads(view):
+    """Разрешает представлению читать с реплики.
+
+    Только для GET/HEAD и только если пользователь не записывал данные
+    последние REPLICA_PIN_SECONDS: иначе реплика могла ещё не получить
+    его изменения.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas or request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        _state.replica = random.choice(replicas)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут на основную базу.
+
+    Для заполнения кэшей, ключи которых меняются при записи: отставшая
+    реплика иначе сохранила бы старые данные под новым ключом.
+    """
+    replica = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = replica
+
+
+class ReplicaMiddleware:
+    """Закрепляет чтения пользователя за основной базой после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _reset()
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+            return response
+        finally:
+            _reset()
+
+
+def count_queries(execute, sql, params, many, context):
+    with _counts_lock:
+        _counts[context['connection'].alias] += 1
+    _state.queries = getattr(_state, 'queries', 0) + 1
+    return execute(sql, params, many, context)
+
+
+def install_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def query_counts():
+    """Число запросов по псевдонимам баз с запуска процесса."""
+    with _counts_lock:
+        return dict(_counts)
+
+
+def thread_queries():
+    """Число запросов текущего потока ко всем базам."""
+    return getattr(_state, 'queries', 0)
+
+
+def reset_query_counts():
+    with _counts_lock:
+        _counts.clear()
@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .lru import LRU
+from .models import SlowQuery
+
+logger = logging.getLogger(__name__)
+
+# Запись идёт прямо в основную базу, минуя роутер: иначе медленное
+# чтение закрепило бы пользователя за основной базой.
+DATABASE = 'default'
+# План запроса одного вида обновляется не чаще раза в PLAN_TIMEOUT
+# секунд на процесс: EXPLAIN на каждый медленный запрос сам бы его
+# удвоил.
+PLAN_TIMEOUT = 300
+
+STRINGS = re.compile(r"'(?:[^']|'')*'")
+NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SPACES = re.compile(r'\s+')
+# Управление транзакциями не улучшить индексом, а запись сводки посреди
+# BEGIN сломала бы открываемую транзакцию.
+SKIPPED = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK', 'COMMIT')
+
+_state = threading.local()
+_explained = LRU(1000, PLAN_TIMEOUT)
+
+
+def normalize(sql):
+    """Запрос без значений: литералы и параметры заменены на ?,
+    списки IN (...) любой длины совпадают.
+    """
+    sql = STRINGS.sub('?', sql)
+    sql = NUMBERS.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = LISTS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(statement):
+    return hashlib.md5(statement.encode()).hexdigest()
+
+
+def explain(connection, sql, params):
+    """План запроса или пустая строка, если его не получить."""
+    words = sql.split(None, 1)
+    if not words or words[0].upper() not in ('SELECT', 'WITH'):
+        return ''
+    sqlite = connection.vendor == 'sqlite'
+    prefix = 'EXPLAIN QUERY PLAN ' if sqlite else 'EXPLAIN '
+    try:
+        # Точка сохранения: ошибка EXPLAIN не должна прервать
+        # транзакцию, в которой выполнялся сам запрос.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(prefix + sql, params)
+                rows = cursor.fetchall()
+    except Exception:
+        return ''
+    if sqlite:
+        return '\n'.join(row[-1] for row in rows)
+    return '\n'.join(' '.join(str(value) for value in row) for row in rows)
+
+
+def capture(connection, sql, params, many, duration):
+    statement = normalize(sql)
+    key = fingerprint(statement)
+    plan = None
+    if not many and _explained.get(key) is None:
+        _explained.set(key, True)
+        plan = explain(connection, sql, params)
+    entry = (key, getattr(_state, 'view', None) or '-', statement, plan,
+             duration)
+    captured = getattr(_state, 'captured', None)
+    if captured is not None:
+        captured.append(entry)
+    elif connections[DATABASE].in_atomic_block:
+        # Вне запроса к сайту (команды, воркеры) пишем после фиксации
+        # транзакции вызывающего кода, а не посреди неё.
+        transaction.on_commit(lambda: flush([entry]), using=DATABASE)
+    else:
+        flush([entry])
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_THRESHOLD
+    if threshold is None or getattr(_state, 'busy', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration >= threshold and not sql.lstrip().upper().startswith(
+            SKIPPED
+        ):
+            _state.busy = True
+            try:
+                capture(context['connection'], sql, params, many, duration)
+            finally:
+                _state.busy = False
+
+
+def install_recorder(sender, connection, **kwargs):
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_queries)
+
+
+def save(entries):
+    """Добавляет замеры к сводке по виду запроса и представлению."""
+    busy, _state.busy = getattr(_state, 'busy', False), True
+    try:
+        now = timezone.now()
+        for key, view, statement, plan, duration in entries:
+            changes = {
+                'calls': F('calls') + 1,
+                'total_time': F('total_time') + duration,
+                'max_time': Greatest(F('max_time'), Value(duration)),
+                'last_seen': now,
+            }
+            if plan is not None:
+                changes['plan'] = plan
+            rows = SlowQuery.objects.using(DATABASE).filter(
+                fingerprint=key, view=view
+            )
+            if rows.update(**changes):
+                continue
+            try:
+                with transaction.atomic(using=DATABASE):
+                    SlowQuery.objects.using(DATABASE).create(
+                        fingerprint=key, view=view, statement=statement,
+                        plan=plan or '', calls=1, total_time=duration,
+                        max_time=duration, last_seen=now,
+                    )
+            except IntegrityError:
+                # Ту же строку одновременно создал другой процесс.
+                rows.update(**changes)
+    finally:
+        _state.busy = busy
+
+
+def flush(entries):
+    """save(), ошибки которого только попадают в журнал: сводка
+    не должна ломать ответ сайта или работу команды.
+    """
+    try:
+        save(entries)
+    except Exception:
+        logger.exception('Не удалось сохранить медленные запросы')
+
+
+class SlowQueryMiddleware:
+    """Копит медленные запросы за время запроса к сайту и сохраняет их
+    после ответа представления вместе с его именем.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.view = None
+        _state.captured = []
+        try:
+            return self.get_response(request)
+        finally:
+            captured = _state.captured
+            _state.view = _state.captured = None
+            if captured:
+                flush(captured)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.view = request.resolver_match.view_name
@@ -0,0 +1,30 @@
+from django.conf import settings
+
+
+def pragmas_for(alias):
+    """Прагмы соединения: общие SQLITE_PRAGMAS поверх них PRAGMAS базы."""
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    pragmas.update(settings.DATABASES.get(alias, {}).get('PRAGMAS', {}))
+    return pragmas
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое SQLite-соединение.
+
+    journal_mode=WAL сохраняется в файле базы, остальные прагмы
+    действуют только на текущее соединение. Смена journal_mode требует
+    монопольной блокировки базы, поэтому режим меняется только если
+    он другой, и уже после busy_timeout.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = pragmas_for(connection.alias)
+    journal_mode = pragmas.pop('journal_mode', None)
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if journal_mode is None:
+            return
+        cursor.execute('PRAGMA journal_mode')
+        if cursor.fetchone()[0].lower() != str(journal_mode).lower():
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
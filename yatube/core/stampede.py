@@ -0,0 +1,125 @@
+import math
+import random
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+FRAGMENTS = 'template_fragments'
+
+
+class StampedeCache(BaseCache):
+    """Обёртка над другим кэшем против одновременного пересчёта значения.
+
+    Значение хранится вместе со сроком свежести и временем расчёта.
+    Срок наступает для каждого запроса в случайный момент чуть раньше
+    настоящего (вероятностное раннее истечение), и пересчитать значение
+    получает право только запрос, захвативший блокировку. Остальные
+    в это время получают старое значение, а если его ещё нет — ждут
+    до WAIT секунд, пока оно появится.
+
+    Протокол get/set совпадает с обычным кэшем: get() возвращает None
+    тому, кто должен пересчитать значение, поэтому тег {% cache %}
+    работает с обёрткой без изменений.
+
+    LOCATION — псевдоним кэша, где лежат значения. OPTIONS: STALE
+    (сколько секунд после срока можно отдавать старое значение), BETA,
+    LOCK_TIMEOUT, WAIT.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.stale = options.pop('STALE', 60)
+        self.beta = options.pop('BETA', 1.0)
+        self.lock_timeout = options.pop('LOCK_TIMEOUT', 10)
+        self.wait = options.pop('WAIT', 2.0)
+        super().__init__(dict(params, OPTIONS=options))
+        self.alias = location or 'default'
+        # Экземпляр свой у каждого потока, как и у любого бэкенда,
+        # поэтому время начала пересчёта можно хранить здесь.
+        self._started = {}
+
+    @property
+    def inner(self):
+        return caches[self.alias]
+
+    def _expired(self, expires, delta):
+        if expires is None:
+            return False
+        early = -delta * self.beta * math.log(1.0 - random.random())
+        return time.time() + early >= expires
+
+    def _lock(self, key, version):
+        timeout = self.lock_timeout
+        if self.default_timeout is not None:
+            timeout = min(timeout, self.default_timeout)
+        if not self.inner.add(f'{key}:lock', 1, timeout, version):
+            return False
+        self._started[(key, version)] = time.monotonic()
+        return True
+
+    def get(self, key, default=None, version=None):
+        entry = self.inner.get(key, version=version)
+        if entry is not None:
+            value, expires, delta = entry
+            if not self._expired(expires, delta):
+                return value
+            if self._lock(key, version):
+                return default
+            return value
+        if self._lock(key, version):
+            return default
+        deadline = time.monotonic() + self.wait
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = self.inner.get(key, version=version)
+            if entry is not None:
+                return entry[0]
+        return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        started = self._started.pop((key, version), None)
+        delta = time.monotonic() - started if started is not None else 0.0
+        if timeout is None:
+            self.inner.set(key, (value, None, delta), None, version)
+            return
+        self.inner.set(
+            key, (value, time.time() + timeout, delta),
+            timeout + self.stale, version,
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self.inner.get(key, version=version) is not None:
+            return False
+        self.set(key, value, timeout, version)
+        return True
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Значение из кэша или результат default() с защитой от
+        одновременного пересчёта.
+        """
+        value = self.get(key, version=version)
+        if value is None:
+            value = default() if callable(default) else default
+            if value is not None:
+                self.set(key, value, timeout, version)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.inner.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.inner.delete(key, version)
+
+    def has_key(self, key, version=None):
+        return self.inner.has_key(key, version)
+
+    def clear(self):
+        self.inner.clear()
+
+
+def cached(key, compute, timeout=DEFAULT_TIMEOUT):
+    """get_or_set для кода представлений через кэш фрагментов."""
+    return caches[FRAGMENTS].get_or_set(key, compute, timeout)
@@ -0,0 +1,23 @@
+from django import template
+from django.templatetags.cache import do_cache
+
+from core.replicas import primary_reads
+
+register = template.Library()
+
+
+class PrimaryNodeList(template.NodeList):
+    def render(self, context):
+        with primary_reads():
+            return super().render(context)
+
+
+@register.tag('cache')
+def do_fragment_cache(parser, token):
+    """{% cache %}, который при промахе рендерит фрагмент по основной
+    базе: фрагменты хранятся под поколениями ленты и не должны
+    заполняться с отставшей реплики.
+    """
+    node = do_cache(parser, token)
+    node.nodelist = PrimaryNodeList(node.nodelist)
+    return node
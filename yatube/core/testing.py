@@ -0,0 +1,62 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TemporaryDirs:
+    """Переносит файловый кэш и метрики во временный каталог на время
+    тестов: их cache.clear() не должен стирать кэш запущенного рядом
+    сайта, а их запросы — попадать в его метрики.
+    """
+
+    def enable(self):
+        self.path = tempfile.mkdtemp(prefix='yatube-tests-')
+        caches = copy.deepcopy(settings.CACHES)
+        for alias, params in caches.items():
+            if os.path.isabs(params.get('LOCATION', '')):
+                params['LOCATION'] = os.path.join(self.path, 'cache', alias)
+        self.override = override_settings(
+            CACHES=caches, METRICS_DIR=os.path.join(self.path, 'metrics')
+        )
+        self.override.enable()
+
+    def disable(self):
+        self.override.disable()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+@contextmanager
+def commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет колбэки transaction.on_commit, отложенные внутри блока.
+
+    TestCase не фиксирует транзакцию, и без этого колбэки не сработали
+    бы вовсе; это замена captureOnCommitCallbacks(execute=True) из
+    Django 3.2.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    # Колбэки могут откладывать новые.
+    while len(connection.run_on_commit) > start:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in callbacks:
+            callback()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.temporary_dirs = TemporaryDirs()
+        self.temporary_dirs.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.temporary_dirs.disable()
+        super().teardown_test_environment(**kwargs)
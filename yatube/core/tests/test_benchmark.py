@@ -0,0 +1,125 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core import benchmark
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class HttpBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='bench_author')
+        group = Group.objects.create(title='Группа', slug='bench')
+        Post.objects.create(text='Пост про котов', author=author, group=group)
+
+    def test_plan_covers_all_safe_routes(self):
+        planned, skipped = benchmark.plan()
+        names = dict(planned)
+        self.assertEqual(
+            sorted(name for name, _ in skipped), sorted(benchmark.UNSAFE)
+        )
+        self.assertEqual(
+            len(planned) + len(skipped), len(list(benchmark.routes()))
+        )
+        self.assertEqual(names['posts:group_list'], '/group/bench/')
+        self.assertTrue(names['posts:search'].startswith('/search/?q='))
+
+    def test_routes_without_data_are_skipped(self):
+        Post.objects.all().delete()
+        planned, skipped = benchmark.plan(['posts:post_detail', 'about:*'])
+        self.assertEqual(
+            [name for name, _ in planned], ['about:author', 'about:tech']
+        )
+        self.assertEqual(skipped[0][0], 'posts:post_detail')
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.95), 7)
+        self.assertIsNone(benchmark.percentile([], 0.5))
+
+    def test_client_mode_counts_statuses_and_queries(self):
+        with benchmark.benchmark_user() as user:
+            result = benchmark.measure_client('/group/bench/', 5, user=user)
+        self.assertEqual(result['statuses'], {'200': 5})
+        self.assertGreater(result['queries'], 0)
+        self.assertLessEqual(result['p50'], result['p99'])
+
+    def test_benchmark_user_does_not_touch_existing_accounts(self):
+        """Аккаунт с именем http_benchmark не получает прав сотрудника."""
+        existing = User.objects.create_user(username=benchmark.BENCHMARK_USER)
+        with benchmark.benchmark_user() as user:
+            self.assertTrue(user.is_staff)
+            self.assertNotEqual(user.pk, existing.pk)
+            self.assertFalse(user.has_usable_password())
+        existing.refresh_from_db()
+        self.assertFalse(existing.is_staff)
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+
+    def test_cold_run_keeps_shared_cache(self):
+        cache.set('benchmark_probe', 1)
+        planned, _ = benchmark.plan(['about:tech'])
+        results = benchmark.run(planned, requests=2, warmup=0, cold=True)
+        self.assertEqual(
+            results['routes']['about:tech']['statuses'], {'200': 2}
+        )
+        self.assertEqual(cache.get('benchmark_probe'), 1)
+        with self.assertRaises(CommandError):
+            call_command(
+                'http_benchmark', 'about:tech', '--mode', 'wsgi', '--cold',
+                '--base-url', 'http://127.0.0.1:1', stdout=StringIO(),
+                stderr=StringIO(),
+            )
+
+    def test_wsgi_mode_serves_concurrent_requests(self):
+        planned, _ = benchmark.plan(['about:*'])
+        results = benchmark.run(
+            planned, mode='wsgi', requests=8, warmup=2, concurrency=3
+        )
+        for name, _ in planned:
+            self.assertEqual(results['routes'][name]['statuses'], {'200': 8})
+        self.assertEqual(results['concurrency'], 3)
+
+    def test_compare_flags_regressions(self):
+        previous = {'routes': {'posts:index': {
+            'p95': 10.0, 'rps': 100.0, 'queries': 2.0,
+        }}}
+        current = {'routes': {'posts:index': {
+            'p95': 11.0, 'rps': 70.0, 'queries': 3.0,
+        }}}
+        self.assertEqual(benchmark.compare(previous, current), [
+            ('posts:index', 'rps', 100.0, 70.0),
+            ('posts:index', 'queries', 2.0, 3.0),
+        ])
+
+    def test_command_saves_and_compares_results(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+        call_command(
+            'http_benchmark', 'about:*', '--requests', '3', '--warmup', '0',
+            '--output', path, stdout=out, stderr=StringIO(),
+        )
+        self.assertIn('about:tech', out.getvalue())
+        with open(path, encoding='utf-8') as stream:
+            saved = json.load(stream)
+        self.assertEqual(saved['routes']['about:tech']['requests'], 3)
+        saved['routes']['about:tech']['queries'] = 0
+        with open(path, 'w', encoding='utf-8') as stream:
+            json.dump(saved, stream)
+        with self.assertRaises(CommandError):
+            call_command(
+                'http_benchmark', 'about:tech', '--requests', '3',
+                '--compare', path, stdout=StringIO(), stderr=StringIO(),
+            )
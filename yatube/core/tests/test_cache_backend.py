@@ -0,0 +1,113 @@
+import pickle
+import shutil
+import tempfile
+import threading
+
+from django.core.cache import cache, caches
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from core.cache import FileBasedCache, TwoTierCache, _Local
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        params = {'OPTIONS': {'GENERATION_INTERVAL': 0, 'LRU_SIZE': 10}}
+        self.first = TwoTierCache(location, params)
+        # Второй экземпляр с собственным локальным уровнем — как в другом
+        # процессе с тем же общим кэшем.
+        self.second = TwoTierCache(location, params)
+        self.second.local = _Local(10, 5)
+
+    def test_reads_are_served_from_local_tier(self):
+        self.first.set('key', {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        self.assertEqual(self.second.get('key'), {'value': 1})
+        stats = self.second.stats()
+        self.assertEqual(stats['shared_hits'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+        self.assertEqual(stats['local_size'], 1)
+
+    def test_changes_invalidate_other_processes(self):
+        self.first.set('key', 'old')
+        self.assertEqual(self.second.get('key'), 'old')
+        self.first.set('key', 'new')
+        self.assertEqual(self.second.get('key'), 'new')
+        self.first.add('counter', 1)
+        self.assertEqual(self.second.get('counter'), 1)
+        self.first.incr('counter')
+        self.assertEqual(self.second.get('counter'), 2)
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_filling_a_miss_keeps_other_local_tiers(self):
+        self.first.set('warm', 1)
+        self.assertEqual(self.second.get('warm'), 1)
+        self.assertIsNone(self.first.get('fragment'))
+        self.first.set('fragment', 'html')
+        self.second.get('warm')
+        self.assertEqual(self.second.stats()['local_hits'], 1)
+
+    def test_adding_a_key_keeps_other_local_tiers(self):
+        self.first.set('warm', 1)
+        self.assertEqual(self.second.get('warm'), 1)
+        self.assertTrue(self.first.add('new', 1))
+        self.second.get('warm')
+        self.assertEqual(self.second.stats()['local_hits'], 1)
+
+    def test_returned_values_are_copies(self):
+        self.first.set('list', [1])
+        self.first.get('list').append(2)
+        self.assertEqual(self.first.get('list'), [1])
+
+
+class FileBasedCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.cache = FileBasedCache(self.location, {})
+
+    def expiry(self, key):
+        with open(self.cache._key_to_file(key), 'rb') as f:
+            return pickle.load(f)
+
+    def test_incr_keeps_expiry(self):
+        self.cache.set('forever', 1, None)
+        self.cache.set('hour', 1, 3600)
+        expiry = self.expiry('hour')
+        self.assertEqual(self.cache.incr('forever'), 2)
+        self.assertEqual(self.cache.incr('hour', 5), 6)
+        self.assertIsNone(self.expiry('forever'))
+        self.assertEqual(self.expiry('hour'), expiry)
+
+    def test_incr_of_missing_key_fails(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_concurrent_incr_loses_nothing(self):
+        self.cache.set('counter', 0, None)
+
+        def work():
+            cache = FileBasedCache(self.location, {})
+            for _ in range(50):
+                cache.incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+
+class FragmentCacheTests(SimpleTestCase):
+    def test_cache_tag_uses_default_backend(self):
+        self.assertIsInstance(caches['default'], TwoTierCache)
+        template = Template(
+            '{% load cache %}{% cache 60 fragment %}{{ value }}{% endcache %}'
+        )
+        cache.clear()
+        self.assertEqual(template.render(Context({'value': 'a'})), 'a')
+        self.assertEqual(template.render(Context({'value': 'b'})), 'a')
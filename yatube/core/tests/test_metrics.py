@@ -0,0 +1,126 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+METRICS_DIR = tempfile.mkdtemp()
+
+
+def record_in_child(_):
+    metrics.REQUESTS.inc(view='posts:index', method='GET', status=200)
+    metrics.LATENCY.observe(0.3, view='posts:index')
+    metrics.registry.flush(force=True)
+
+
+@override_settings(METRICS_DIR=METRICS_DIR)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(METRICS_DIR, ignore_errors=True)
+        metrics.registry.reset()
+        self.staff = User.objects.create_user(username='ops', is_staff=True)
+        self.client = Client()
+
+    def scrape(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/нет-такой-страницы/')
+        text = self.scrape()
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_requests_total{view="<unresolved>",method="GET",'
+            'status="404"} 1', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn('# TYPE yatube_http_request_queries histogram', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for value in (0.001, 0.02, 0.02, 20):
+            metrics.LATENCY.observe(value, view='v')
+        text = metrics.registry.render()
+        name = 'yatube_http_request_duration_seconds'
+        self.assertIn(f'{name}_bucket{{view="v",le="0.005"}} 1', text)
+        self.assertIn(f'{name}_bucket{{view="v",le="0.025"}} 3', text)
+        self.assertIn(f'{name}_bucket{{view="v",le="10"}} 3', text)
+        self.assertIn(f'{name}_bucket{{view="v",le="+Inf"}} 4', text)
+        self.assertIn(f'{name}_sum{{view="v"}} 20.041', text)
+
+    def test_values_of_all_processes_are_summed(self):
+        metrics.REQUESTS.inc(view='posts:index', method='GET', status=200)
+        context = multiprocessing.get_context('fork')
+        with override_settings(METRICS_DIR=METRICS_DIR):
+            with context.Pool(2) as pool:
+                pool.map(record_in_child, range(2))
+        expected = (
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 3'
+        )
+        self.assertIn(expected, metrics.registry.render())
+        # Файлы завершившихся процессов сведены в архив без потерь.
+        files = sorted(
+            name for name in os.listdir(METRICS_DIR)
+            if name.endswith('.json')
+        )
+        self.assertEqual(
+            files, sorted([metrics.ARCHIVE, metrics.registry.name])
+        )
+        self.assertIn(expected, metrics.registry.render())
+
+    def test_reused_pid_does_not_overwrite_old_file(self):
+        """Файл прежнего процесса с тем же pid не затирается."""
+        os.makedirs(METRICS_DIR)
+        key = metrics.REQUESTS.key(
+            {'view': 'posts:index', 'method': 'GET', 'status': 200}
+        )
+        old = os.path.join(METRICS_DIR, f'{os.getpid()}-old.json')
+        with open(old, 'w', encoding='utf-8') as stream:
+            json.dump({key: 5}, stream)
+        metrics.REQUESTS.inc(view='posts:index', method='GET', status=200)
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 6', metrics.registry.render()
+        )
+
+    def test_unknown_methods_share_one_label(self):
+        self.client.generic('BREW', reverse('posts:index'))
+        self.client.generic('PROPFIND', reverse('posts:index'))
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",method="OTHER",'
+            'status="200"} 2', self.scrape()
+        )
+
+    def test_endpoint_is_for_staff_only(self):
+        User.objects.create_user(username='reader')
+        self.client.force_login(User.objects.get(username='reader'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db import router
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.replicas import (PIN_COOKIE, ReplicaMiddleware, query_counts,
+                           replica_reads, reset_query_counts)
+from posts import follow_cache
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@replica_reads
+def read_view(request):
+    if request.GET.get('write'):
+        Group.objects.create(title='Группа', slug='group')
+    return HttpResponse(
+        f'{router.db_for_read(Post)} {router.db_for_read(User)}'
+    )
+
+
+@replica_reads
+def fragment_view(request):
+    template = Template(
+        '{% load fragments %}'
+        '{% cache 60 replica_fragment %}{{ db }}{% endcache %} {{ db }}'
+    )
+    context = Context({'db': lambda: router.db_for_read(Post)})
+    return HttpResponse(template.render(context))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.handler = ReplicaMiddleware(read_view)
+
+    def routed(self, request):
+        return self.handler(request).content.decode().split()[0]
+
+    def test_safe_reads_go_to_replica(self):
+        self.assertEqual(self.routed(self.factory.get('/')), 'replica')
+        self.assertEqual(self.routed(self.factory.head('/')), 'replica')
+        self.assertEqual(self.routed(self.factory.post('/')), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_auth_reads_stay_on_primary(self):
+        response = self.handler(self.factory.get('/'))
+        self.assertEqual(response.content.decode(), 'replica default')
+
+    def test_reads_after_write_stay_on_primary(self):
+        response = self.handler(self.factory.get('/', {'write': 1}))
+        self.assertEqual(response.content.decode(), 'default default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.routed(request), 'default')
+
+    def test_cache_fragments_are_rendered_from_primary(self):
+        caches['template_fragments'].delete(
+            make_template_fragment_key('replica_fragment')
+        )
+        handler = ReplicaMiddleware(fragment_view)
+        response = handler(self.factory.get('/'))
+        self.assertEqual(response.content.decode(), 'default replica')
+
+    def test_follow_set_is_loaded_from_primary(self):
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=user, author=author)
+        follow_cache.invalidate(user.pk)
+
+        @replica_reads
+        def view(request):
+            return HttpResponse(list(follow_cache.followed_ids(user.pk)))
+
+        # Псевдонима replica в DATABASES нет: чтение с реплики упало бы.
+        response = ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content.decode(), str(author.pk))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        self.assertEqual(self.routed(self.factory.get('/')), 'default')
+
+
+class ReplicaPinTests(TestCase):
+    def test_pin_cookie_is_set_only_after_writes(self):
+        user = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_queries_are_counted_per_alias(self):
+        reset_query_counts()
+        list(Post.objects.all())
+        self.assertGreaterEqual(query_counts().get('default', 0), 1)
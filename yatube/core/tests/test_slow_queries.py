@@ -0,0 +1,126 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import slow_queries
+from core.models import SlowQuery
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0.0)
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='slow_author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        with self.settings(SLOW_QUERY_THRESHOLD=None):
+            cache.clear()
+            # Запросы setUpTestData тоже попали в сводку.
+            SlowQuery.objects.all().delete()
+        slow_queries._explained = slow_queries.LRU(
+            1000, slow_queries.PLAN_TIMEOUT
+        )
+        self.client = Client()
+
+    def test_normalize_strips_values(self):
+        self.assertEqual(
+            slow_queries.normalize(
+                "SELECT *  FROM t\nWHERE a = 'x''y' AND b IN (%s, %s, %s) "
+                "LIMIT 10"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            slow_queries.normalize('SELECT * FROM t WHERE id IN (%s)'),
+            slow_queries.normalize('SELECT * FROM t WHERE id IN (%s, %s)'),
+        )
+
+    def test_queries_are_recorded_with_view_and_plan(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        recorded = SlowQuery.objects.filter(view='posts:post_detail')
+        self.assertTrue(recorded.exists())
+        post_query = recorded.get(statement__contains='"posts_post"."text"')
+        self.assertEqual(post_query.calls, 1)
+        self.assertIn('posts_post', post_query.plan)
+        with self.settings(SLOW_QUERY_THRESHOLD=None):
+            cache.clear()
+        self.client.get(url)
+        post_query.refresh_from_db()
+        self.assertEqual(post_query.calls, 2)
+        self.assertGreaterEqual(post_query.total_time, post_query.max_time)
+
+    def test_recorder_can_be_disabled(self):
+        with self.settings(SLOW_QUERY_THRESHOLD=None):
+            self.client.get(reverse('posts:index'))
+            self.assertFalse(SlowQuery.objects.exists())
+
+    def test_failed_report_does_not_break_response(self):
+        self.addCleanup(setattr, slow_queries, 'DATABASE', 'default')
+        slow_queries.DATABASE = 'missing'
+        with self.assertLogs('core.slow_queries', 'ERROR'):
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_report_ranks_by_total_time(self):
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        # Запросы самой команды не должны менять сводку по ходу проверки.
+        with self.settings(SLOW_QUERY_THRESHOLD=None):
+            call_command('slow_queries', '--limit', '3', stdout=out)
+            top = SlowQuery.objects.first()
+        self.assertTrue(out.getvalue().startswith(f'1. {top.view}'))
+        self.assertIn(top.statement, out.getvalue())
+
+    def test_admin_lists_slow_queries(self):
+        admin = User.objects.create_superuser(
+            'slow_admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('admin:core_slowquery_changelist')
+        )
+        self.assertContains(response, 'posts:index')
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0.0)
+class SlowQueryOutsideRequestTests(TransactionTestCase):
+    statement = 'SELECT COUNT(*) FROM posts_post WHERE id > ?'
+
+    def setUp(self):
+        slow_queries._explained = slow_queries.LRU(
+            1000, slow_queries.PLAN_TIMEOUT
+        )
+
+    def count_posts(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM posts_post WHERE id > %s', [0]
+            )
+
+    def test_queries_outside_requests_are_saved_at_once(self):
+        self.count_posts()
+        recorded = SlowQuery.objects.get(statement=self.statement)
+        self.assertEqual(recorded.view, '-')
+        self.assertTrue(recorded.plan)
+
+    def test_queries_in_transaction_are_saved_after_commit(self):
+        with transaction.atomic():
+            self.count_posts()
+            self.assertFalse(
+                SlowQuery.objects.filter(statement=self.statement).exists()
+            )
+        self.assertTrue(
+            SlowQuery.objects.filter(statement=self.statement).exists()
+        )
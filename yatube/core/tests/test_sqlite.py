@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+
+from core.sqlite import pragmas_for
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_tuned(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    @override_settings(
+        SQLITE_PRAGMAS={'synchronous': 'normal', 'busy_timeout': 5000},
+        DATABASES={'default': {'PRAGMAS': {'busy_timeout': 100}}},
+    )
+    def test_database_pragmas_override_defaults(self):
+        self.assertEqual(
+            pragmas_for('default'),
+            {'synchronous': 'normal', 'busy_timeout': 100},
+        )
+
+    def test_wal_is_not_switched_again(self):
+        """Режим WAL уже записан в файле базы: соединение его не меняет."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'wal.sqlite3')
+        statements = []
+        for _ in range(2):
+            wrapper = DatabaseWrapper(
+                dict(connection.settings_dict, NAME=path), 'default'
+            )
+            wrapper.force_debug_cursor = True
+            wrapper.ensure_connection()
+            statements.append([query['sql'] for query in wrapper.queries])
+            wrapper.close()
+        self.assertIn('PRAGMA journal_mode = wal', statements[0])
+        self.assertIn('PRAGMA journal_mode', statements[1])
+        self.assertNotIn('PRAGMA journal_mode = wal', statements[1])
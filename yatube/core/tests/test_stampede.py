@@ -0,0 +1,57 @@
+import threading
+import time
+
+from django.core.cache import cache, caches
+from django.template import Context, Template
+from django.test import SimpleTestCase
+
+from core.stampede import FRAGMENTS, StampedeCache, cached
+
+
+class StampedeCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.fragments = caches[FRAGMENTS]
+
+    def test_concurrent_misses_compute_once(self):
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'значение'
+
+        def request():
+            results.append(cached('slow', compute, 60))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['значение'] * 5)
+
+    def test_stale_value_is_served_during_refresh(self):
+        cache.set('page', ('старое', time.time() - 1, 0.1), 60)
+        self.assertIsNone(self.fragments.get('page'))
+        other = StampedeCache('default', {})
+        self.assertEqual(other.get('page'), 'старое')
+        self.fragments.set('page', 'новое', 60)
+        self.assertEqual(other.get('page'), 'новое')
+
+    def test_early_expiration_is_probabilistic(self):
+        soon = time.time() + 1
+        eager = StampedeCache('default', {'OPTIONS': {'BETA': 1000}})
+        lazy = StampedeCache('default', {'OPTIONS': {'BETA': 0}})
+        self.assertTrue(eager._expired(soon, 0.5))
+        self.assertFalse(lazy._expired(soon, 0.5))
+        self.assertFalse(eager._expired(None, 0.5))
+
+    def test_cache_tag_goes_through_wrapper(self):
+        template = Template(
+            '{% load cache %}{% cache 60 stampede %}{{ value }}{% endcache %}'
+        )
+        self.assertEqual(template.render(Context({'value': 'a'})), 'a')
+        self.assertEqual(template.render(Context({'value': 'b'})), 'a')
+        self.assertIsInstance(self.fragments, StampedeCache)
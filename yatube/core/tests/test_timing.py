@@ -0,0 +1,96 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import timing
+from posts.models import Post
+
+User = get_user_model()
+
+
+def parse(header):
+    metrics = {}
+    for part in header.split(', '):
+        name, *params = part.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='timing_author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.staff = User.objects.create_user(username='ops', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_header_breaks_down_request(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        metrics = parse(response['Server-Timing'])
+        self.assertEqual(
+            set(metrics), {'db', 'cache', 'tpl', 'thumb', 'total'}
+        )
+        self.assertEqual(
+            metrics['db']['desc'], f'"queries={len(queries)}"'
+        )
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        parts = sum(
+            float(metrics[name]['dur'])
+            for name in ('db', 'cache', 'tpl', 'thumb')
+        )
+        self.assertLessEqual(parts, float(metrics['total']['dur']) + 0.5)
+
+    def test_cache_hits_are_counted(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        metrics = parse(self.client.get(url)['Server-Timing'])
+        self.assertNotIn('hits=0 ', metrics['cache']['desc'])
+
+    def test_log_line_names_view(self):
+        url = reverse('posts:profile', kwargs={'username': 'timing_author'})
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(url)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+
+    def test_header_is_for_staff_only(self):
+        """Остальным заголовок не отдаётся, но запрос попадает в журнал."""
+        for user in (None, self.author):
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            with self.subTest(user=user):
+                with self.assertLogs('core.timing', 'INFO'):
+                    response = client.get(reverse('posts:index'))
+                self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_measured(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_nested_sections_count_own_time(self):
+        timing._state.timings = timings = timing.Timings()
+        try:
+            with timing.measure('template'):
+                with timing.measure('db'):
+                    time.sleep(0.02)
+        finally:
+            timing._state.timings = None
+        self.assertGreaterEqual(timings.durations['db'], 0.02)
+        self.assertLess(timings.durations['template'], 0.01)
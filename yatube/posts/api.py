@@ -0,0 +1,203 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
+
+from core.replicas import primary_reads, replica_reads
+from core.stampede import cached
+
+from . import feed_cache
+from .models import Comment, Group, Post
+from .paginators import (CommentPaginator, CursorPaginator, FollowPaginator,
+                         normalize_cursor)
+from .timeline import follow_posts
+from .views import (follow_etag, group_etag, index_etag, post_etag,
+                    profile_etag)
+
+User = get_user_model()
+
+# Имя поля в ответе -> выражение для values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class ApiError(Exception):
+    status = 400
+
+
+class Unauthorized(ApiError):
+    status = 401
+
+
+def api_view(etag_func):
+    """JSON вместо HTML: ошибки кодами ответа, ETag ленты, сжатие gzip.
+
+    gzip_page стоит снаружи condition, чтобы ETag сжатого ответа
+    помечался как слабый и не совпадал с ETag несжатого.
+    """
+    def decorator(view):
+        @gzip_page
+        @replica_reads
+        @condition(etag_func=etag_func)
+        @require_GET
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                data = view(request, *args, **kwargs)
+            except ApiError as error:
+                return json_response({'error': str(error)}, error.status)
+            except Http404:
+                return json_response({'error': 'Не найдено'}, 404)
+            return json_response(data)
+        return wrapper
+    return decorator
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=a,b или все доступные; неизвестные — ошибка 400."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name for name in raw.split(',') if name]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def serialize(rows, fields, available):
+    """Переименовывает ключи values() в поля ответа без создания моделей."""
+    result = []
+    for row in rows:
+        item = {name: row[available[name]] for name in fields}
+        if item.get('image') is not None:
+            item['image'] = (
+                default_storage.url(item['image']) if item['image'] else None
+            )
+        result.append(item)
+    return result
+
+
+def post_rows(queryset, fields, paginator_class=CursorPaginator):
+    lookups = {POST_FIELDS[name] for name in fields} | {'id', 'pub_date'}
+    lookups |= {paginator_class.field, paginator_class.key} - {'pk'}
+    return queryset.order_by().values(*lookups)
+
+
+def feed(request, queryset, *scopes, paginator_class=CursorPaginator):
+    """Страница ленты; данные кэшируются по поколениям её областей.
+
+    queryset может быть функцией: тогда он строится только при промахе.
+    """
+    fields = requested_fields(request, POST_FIELDS)
+
+    def compute():
+        # Страница кэшируется под поколениями ленты, поэтому читается
+        # с основной базы, а не с реплики.
+        with primary_reads():
+            posts = queryset() if callable(queryset) else queryset
+            paginator = paginator_class(
+                post_rows(posts, fields, paginator_class),
+                settings.PAGINATOR_PAGES,
+            )
+            page = paginator.get_page(request.GET.get('cursor'))
+        return {
+            'results': serialize(page, fields, POST_FIELDS),
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+    position = 'cursor:' + normalize_cursor(request.GET.get('cursor'))
+    key = 'api_feed:{}:{}'.format(
+        feed_cache.key(position, *scopes), ','.join(fields)
+    )
+    return cached(key, compute, settings.FEED_CACHE_TIMEOUT)
+
+
+@api_view(index_etag)
+def index(request):
+    return feed(request, Post.objects.all(), 'index')
+
+
+@api_view(group_etag)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        raise Http404
+    return feed(
+        request, Post.objects.filter(group_id=group_id), f'group:{group_id}'
+    )
+
+
+@api_view(profile_etag)
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        raise Http404
+    return feed(
+        request, Post.objects.filter(author_id=author_id),
+        f'profile:{author_id}'
+    )
+
+
+@api_view(follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        raise Unauthorized('Требуется вход')
+    user = request.user
+    return feed(
+        request, lambda: follow_posts(user), 'index', f'follow:{user.pk}',
+        paginator_class=FollowPaginator,
+    )
+
+
+@api_view(post_etag)
+def post_detail(request, post_id):
+    fields = requested_fields(request, POST_FIELDS)
+    rows = serialize(
+        post_rows(Post.objects.filter(pk=post_id), fields),
+        fields, POST_FIELDS,
+    )
+    if not rows:
+        raise Http404
+    return {'post': rows[0], **comment_page(request, post_id)}
+
+
+def comment_page(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).values(
+        *COMMENT_FIELDS.values()
+    )
+    paginator = CommentPaginator(comments, settings.COMMENTS_PAGE)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'comments': serialize(page, list(COMMENT_FIELDS), COMMENT_FIELDS),
+        'next': page.next_cursor,
+    }
+
+
+@api_view(post_etag)
+def post_comments(request, post_id):
+    return comment_page(request, post_id)
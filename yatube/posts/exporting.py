@@ -0,0 +1,97 @@
+import json
+import os
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+FLUSH_SIZE = 64 * 1024
+
+
+def posts(user):
+    return Post.objects.filter(author=user).order_by('pk').values(
+        'id', 'text', 'pub_date', 'group__slug', 'image'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def comments(user):
+    return Comment.objects.filter(author=user).order_by('pk').values(
+        'id', 'post_id', 'text', 'created'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def jsonl(rows):
+    """Строки JSONL, сгруппированные в куски примерно по FLUSH_SIZE."""
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+        line = (line + '\n').encode()
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def export_jsonl(user):
+    """Посты и комментарии пользователя одним потоком JSONL."""
+    yield from jsonl(
+        dict(row, type='post') for row in posts(user)
+    )
+    yield from jsonl(
+        dict(row, type='comment') for row in comments(user)
+    )
+
+
+class _Sink:
+    """Файлоподобный приёмник без seek: zipfile пишет, генератор забирает."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(user, include_images=True):
+    """ZIP-архив с posts.jsonl, comments.jsonl и картинками постов."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        images = []
+        with archive.open('posts.jsonl', 'w') as member:
+            for chunk in jsonl(posts(user)):
+                member.write(chunk)
+                yield sink.pop()
+        with archive.open('comments.jsonl', 'w') as member:
+            for chunk in jsonl(comments(user)):
+                member.write(chunk)
+                yield sink.pop()
+        if include_images:
+            images = Post.objects.filter(author=user).exclude(
+                image=''
+            ).values_list('image', flat=True).iterator(chunk_size=CHUNK_SIZE)
+        for name in images:
+            if not default_storage.exists(name):
+                continue
+            info = zipfile.ZipInfo(os.path.join('images', name))
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name) as source:
+                with archive.open(info, 'w') as member:
+                    for chunk in source.chunks():
+                        member.write(chunk)
+                        yield sink.pop()
+    yield sink.pop()
@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIX = 'feed_generation:'
+
+
+def _initial():
+    # Счётчик, потерянный при вытеснении из кэша, не должен совпасть
+    # со старым значением, иначе вернутся устаревшие фрагменты.
+    return int(time.time() * 1000)
+
+
+def generations(*scopes):
+    """Текущие поколения для набора областей ленты."""
+    keys = [PREFIX + scope for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    for key, value in missing.items():
+        if not cache.add(key, value, None):
+            missing[key] = cache.get(key, value)
+    found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Инвалидирует все фрагменты, зависящие от указанных областей.
+
+    Поколения сдвигаются ещё раз после фиксации транзакции: иначе
+    запрос, прочитавший базу до неё, сохранил бы старые данные под
+    новым поколением (и отдал бы с ним ETag).
+    """
+    scopes = set(scopes)
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    for scope in scopes:
+        try:
+            cache.incr(PREFIX + scope)
+        except ValueError:
+            cache.set(PREFIX + scope, _initial(), None)
+
+
+def key(position, *scopes):
+    """Ключ фрагмента: области с их поколениями и позиция в ленте.
+
+    position должна быть уже проверенной (номер существующей страницы,
+    канонический курсор), а не сырым параметром запроса: иначе любое
+    значение ?page= заводило бы в кэше новую копию страницы.
+    """
+    parts = [
+        f'{scope}.{generation}'
+        for scope, generation in zip(scopes, generations(*scopes))
+    ]
+    parts.append(position)
+    return ':'.join(parts)
+
+
+def etag(request, *scopes):
+    """Валидатор страницы: поколения областей и текущий пользователь."""
+    parts = [str(request.user.pk)]
+    parts.extend(
+        f'{scope}.{generation}'
+        for scope, generation in zip(scopes, generations(*scopes))
+    )
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def post_scopes(post, *group_ids):
+    scopes = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    scopes.extend(
+        f'group:{group_id}'
+        for group_id in (post.group_id, *group_ids)
+        if group_id is not None
+    )
+    return scopes
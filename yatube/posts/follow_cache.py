@@ -0,0 +1,73 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.replicas import primary_reads
+
+from .models import Follow
+
+PREFIX = 'follow_set:'
+
+
+def _key(user_id):
+    return f'{PREFIX}{user_id}'
+
+
+def _load(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return ids
+
+
+def _store(user_id, ids):
+    cache.set(
+        _key(user_id), ids.tobytes(), settings.FOLLOW_CACHE_TIMEOUT
+    )
+
+
+def followed_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан user_id."""
+    data = cache.get(_key(user_id))
+    if data is not None:
+        return _load(data)
+    with primary_reads():
+        ids = array('q', Follow.objects.filter(user_id=user_id).order_by(
+            'author_id').values_list('author_id', flat=True))
+    _store(user_id, ids)
+    return ids
+
+
+def _contains(ids, author_id):
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def is_following(viewer, authors):
+    """Пакетная проверка подписок: {id автора: подписан ли viewer}.
+
+    authors — пользователи или их id. Для анонима все значения False
+    и обращений к кэшу нет.
+    """
+    author_ids = [getattr(author, 'pk', author) for author in authors]
+    if not viewer.is_authenticated:
+        return dict.fromkeys(author_ids, False)
+    ids = followed_ids(viewer.pk)
+    return {
+        author_id: _contains(ids, author_id) for author_id in author_ids
+    }
+
+
+def invalidate(*user_ids):
+    """Сбрасывает наборы подписок после их изменения.
+
+    Набор не правится на месте: чтение и запись ключа — две операции,
+    и параллельные подписки того же пользователя затирали бы друг
+    друга. Сброс повторяется после фиксации транзакции, чтобы набор,
+    прочитанный до неё, не остался в кэше.
+    """
+    keys = [_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,226 @@
+import csv
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import feed_cache, follow_cache, stats, thumbnails, timeline
+from .models import Follow, Group, Post
+
+User = get_user_model()
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+def batched(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def keep_pub_date():
+    """Сохраняет даты из источника: auto_now_add перезаписал бы их."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Importer:
+    """Превращает пачку записей в объекты модели и пишет их bulk_create.
+
+    Ссылки на пользователей и группы разрешаются по словарям в памяти,
+    загруженным одним запросом, а не запросом на каждую строку.
+    """
+    model = None
+
+    def __init__(self, create_users=False):
+        self.create_users = create_users
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.skipped = 0
+        self.touched_users = set()
+
+    def user_id(self, username):
+        return self.users.get(username)
+
+    def ensure_users(self, usernames):
+        missing = {
+            name for name in usernames if name and name not in self.users
+        }
+        if not missing or not self.create_users:
+            return
+        new_users = []
+        for username in missing:
+            user = User(username=username)
+            user.set_unusable_password()
+            new_users.append(user)
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        self.users.update(
+            User.objects.filter(username__in=missing)
+            .values_list('username', 'pk')
+        )
+
+    def build(self, record):
+        raise NotImplementedError
+
+    def write(self, batch):
+        objects = []
+        for record in batch:
+            obj = self.build(record)
+            if obj is None:
+                self.skipped += 1
+            else:
+                objects.append(obj)
+        with transaction.atomic():
+            self.model.objects.bulk_create(objects, ignore_conflicts=True)
+        return len(objects)
+
+    def finish(self):
+        """Обновляет производные данные, которые bulk_create обходит."""
+        touched = list(self.touched_users)
+        for start in range(0, len(touched), 1000):
+            stats.recompute(touched[start:start + 1000])
+
+
+class GroupImporter(Importer):
+    model = Group
+
+    def build(self, record):
+        if not record.get('slug'):
+            return None
+        return Group(
+            slug=record['slug'],
+            title=record.get('title') or record['slug'],
+            description=record.get('description') or '',
+        )
+
+    def finish(self):
+        feed_cache.bump('index')
+
+
+class PostImporter(Importer):
+    model = Post
+
+    def __init__(self, create_users=False):
+        super().__init__(create_users)
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.touched_groups = set()
+        # Новые посты получат id больше этого: по нему finish() находит
+        # их без списка id, которого bulk_create на SQLite не возвращает.
+        self.last_id = Post.objects.aggregate(Max('pk'))['pk__max'] or 0
+
+    def write(self, batch):
+        self.ensure_users(record.get('author') for record in batch)
+        with keep_pub_date():
+            return super().write(batch)
+
+    def build(self, record):
+        author_id = self.user_id(record.get('author'))
+        if author_id is None or not record.get('text'):
+            return None
+        group_id = None
+        if record.get('group'):
+            group_id = self.groups.get(record['group'])
+            if group_id is None:
+                return None
+        pub_date = None
+        if record.get('pub_date'):
+            pub_date = parse_datetime(record['pub_date'])
+            if pub_date is None:
+                return None
+        self.touched_users.add(author_id)
+        self.touched_groups.add(group_id)
+        return Post(
+            text=record['text'],
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date or timezone.now(),
+            image=record.get('image') or '',
+        )
+
+    def finish(self):
+        super().finish()
+        # Посты знаменитостей читаются живым запросом, их ленты не нужны.
+        followers = set()
+        authors = list(self.touched_users)
+        for start in range(0, len(authors), 1000):
+            followers.update(Follow.objects.filter(
+                author_id__in=authors[start:start + 1000],
+                author__stats__followers__lte=settings.TIMELINE_FANOUT_LIMIT,
+            ).values_list('user_id', flat=True))
+        timeline.rebuild(followers)
+        thumbnails.enqueue_many(
+            Post.objects.filter(pk__gt=self.last_id).exclude(image='')
+            .values_list('pk', flat=True).iterator()
+        )
+        feed_cache.bump('index', *(
+            f'profile:{pk}' for pk in self.touched_users
+        ), *(
+            f'group:{pk}' for pk in self.touched_groups if pk is not None
+        ), *(
+            f'follow:{pk}' for pk in followers
+        ))
+
+
+class FollowImporter(Importer):
+    model = Follow
+
+    def __init__(self, create_users=False):
+        super().__init__(create_users)
+        self.followers = set()
+
+    def write(self, batch):
+        self.ensure_users(
+            name for record in batch
+            for name in (record.get('user'), record.get('author'))
+        )
+        return super().write(batch)
+
+    def build(self, record):
+        user_id = self.user_id(record.get('user'))
+        author_id = self.user_id(record.get('author'))
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        self.touched_users.update((user_id, author_id))
+        self.followers.add(user_id)
+        return Follow(user_id=user_id, author_id=author_id)
+
+    def finish(self):
+        super().finish()
+        timeline.rebuild(self.followers)
+        feed_cache.bump(*(f'follow:{pk}' for pk in self.touched_users))
+        follow_cache.invalidate(*self.touched_users)
+
+
+IMPORTERS = {
+    'groups': GroupImporter,
+    'posts': PostImporter,
+    'follows': FollowImporter,
+}
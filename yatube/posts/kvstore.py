@@ -0,0 +1,81 @@
+from django.conf import settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.lru import LRU
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище метаданных миниатюр: LRU процесса, общий кэш, затем БД.
+
+    БД остаётся источником истины, поэтому после перезапуска воркеров
+    миниатюры находятся без повторной генерации. Промахи кэшируются
+    ненадолго, чтобы готовая воркером миниатюра быстро стала видна.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lru = LRU(
+            settings.THUMBNAIL_LRU_SIZE, settings.THUMBNAIL_LRU_TIMEOUT
+        )
+
+    def prefetch(self, file_keys):
+        """Загружает пачку ключей миниатюр одним запросом к кэшу и к БД."""
+        keys = [
+            add_prefix(key) for key in file_keys
+            if self.lru.get(add_prefix(key)) is None
+        ]
+        if not keys:
+            return
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            rows = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            self.cache.set_many(
+                rows, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            self.cache.set_many(
+                {key: '' for key in missing if key not in rows},
+                settings.THUMBNAIL_MISS_TIMEOUT,
+            )
+            found.update(rows)
+        for key, value in found.items():
+            if value:
+                self.lru.set(key, value)
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is not None:
+            return value
+        value = self.cache.get(key)
+        if value is None:
+            try:
+                value = KVStoreModel.objects.get(key=key).value
+            except KVStoreModel.DoesNotExist:
+                self.cache.set(key, '', settings.THUMBNAIL_MISS_TIMEOUT)
+                return None
+            self.cache.set(
+                key, value, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+        if not value:
+            return None
+        self.lru.set(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        for key in keys:
+            self.lru.delete(key)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.models import Group
+from posts.query_plans import explain, feed_queries, problems
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Проверяет планы запросов лент через EXPLAIN QUERY PLAN.'
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            follows=Count('follower')).order_by('-follows').first()
+        group = Group.objects.first()
+        if user is None or group is None:
+            raise CommandError('Нужны хотя бы один пользователь и группа.')
+        # Автор с наибольшим числом подписчиков проверяет ветку ленты
+        # подписок для знаменитостей.
+        celebrity = User.objects.annotate(
+            followers=Count('following')).order_by('-followers').first()
+        failed = []
+        for name, queryset in feed_queries(user, group, celebrity).items():
+            plan = explain(queryset)
+            self.stdout.write(name)
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            if problems(plan):
+                failed.append(name)
+        if failed:
+            raise CommandError(
+                'Полный проход или сортировка без индекса: '
+                + ', '.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы'))
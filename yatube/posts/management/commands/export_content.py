@@ -0,0 +1,41 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporting import export_jsonl, export_zip
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты и комментарии пользователя.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Файл для записи или - для stdout.')
+        parser.add_argument(
+            '--zip', action='store_true',
+            help='ZIP-архив вместе с картинками постов вместо JSONL.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        chunks = export_zip(user) if options['zip'] else export_jsonl(user)
+        path = options['path']
+        stream = sys.stdout.buffer if path == '-' else open(path, 'wb')
+        size = 0
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+                size += len(chunk)
+        finally:
+            if path != '-':
+                stream.close()
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f'записано {size} байт'))
@@ -0,0 +1,68 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import IMPORTERS, READERS, batched
+
+
+class Command(BaseCommand):
+    help = 'Потоково загружает группы, посты или подписки из JSONL/CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='Файл с данными или - для stdin.')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных пользователей без пароля.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        importer = IMPORTERS[options['kind']](options['create_users'])
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        written = 0
+        started = time.monotonic()
+        failure = None
+        try:
+            records = READERS[data_format](stream)
+            for batch in batched(records, options['batch_size']):
+                written += importer.write(batch)
+                self.report(written, importer.skipped, started)
+        except (ValueError, KeyError, csv.Error) as error:
+            failure = error
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        # Пачки до ошибки уже зафиксированы: счётчики, ленты и очередь
+        # миниатюр обновляются и для них.
+        importer.finish()
+        if failure is not None:
+            raise CommandError(
+                f'Ошибка в данных: {failure}; записано {written} строк'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            self.report(written, importer.skipped, started, final=True)
+        ))
+
+    def report(self, written, skipped, started, final=False):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        line = (
+            f'записано {written}, пропущено {skipped}, '
+            f'{written / elapsed:.0f} строк/с'
+        )
+        if not final:
+            self.stderr.write(line)
+        return line
@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache, timeline
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики всех пользователей и заново строит ленты '
+        'подписок. Нужна для подписок и постов, появившихся до лент или '
+        'в обход сигналов; запускается миграцией 0017.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Ленты берут только авторов со строкой AuthorStats и не больше
+        # TIMELINE_FANOUT_LIMIT подписчиков, поэтому сначала счётчики.
+        call_command(
+            'recount_stats', batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+        followers = (
+            Follow.objects.order_by('user_id')
+            .values_list('user_id', flat=True).distinct()
+        )
+        batch = []
+        total = 0
+        for pk in followers.iterator():
+            batch.append(pk)
+            if len(batch) == options['batch_size']:
+                total += self.rebuild(batch)
+                batch = []
+        total += self.rebuild(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перестроены ленты {total} пользователей'
+        ))
+
+    def rebuild(self, user_ids):
+        if user_ids:
+            timeline.rebuild(user_ids)
+            feed_cache.bump(*(f'follow:{pk}' for pk in user_ids))
+        return len(user_ids)
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.stats import recompute
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'usernames', nargs='*',
+            help='Пользователи для пересчёта; по умолчанию все.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        batch_size = options['batch_size']
+        batch = []
+        total = 0
+        for pk in users.values_list('pk', flat=True).iterator():
+            batch.append(pk)
+            if len(batch) == batch_size:
+                recompute(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            recompute(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны счётчики {total} пользователей'
+        ))
@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from posts.seeding import Seeder
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, '
+        'подписками, постами и комментариями для нагрузочных замеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=500)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=200000,
+            help='Сколько подписок создать примерно, всего.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Начало имён пользователей и адресов групп.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--until',
+            help='Дата самого позднего поста; по умолчанию сейчас.'
+        )
+        parser.add_argument('--batch-size', type=int, default=20000)
+        parser.add_argument(
+            '--no-timelines', dest='timelines', action='store_false',
+            help='Не материализовать ленты подписок.'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix!r} уже есть, '
+                'выберите другой --prefix'
+            )
+        until = None
+        if options['until']:
+            until = parse_datetime(options['until'])
+            if until is None or until.tzinfo is None:
+                raise CommandError('--until: нужна дата с часовым поясом')
+        seeder = Seeder(
+            options['seed'], prefix=prefix, days=options['days'],
+            until=until, batch_size=options['batch_size'],
+            progress=self.report,
+        )
+        started = time.monotonic()
+        written = seeder.run(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'], options['timelines'],
+        )
+        summary = ', '.join(
+            f'{name} {count}' for name, count in written.items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{summary} за {time.monotonic() - started:.0f} с'
+        ))
+
+    def report(self, table, written, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stderr.write(
+            f'{table}: {written}, {written / elapsed:.0f} строк/с'
+        )
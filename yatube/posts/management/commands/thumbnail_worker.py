@@ -0,0 +1,96 @@
+import logging
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import F
+
+from posts.models import ThumbnailJob
+from posts.thumbnails import backfill, generate
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def process(job):
+    pk, post_id, created = job
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры поста %s', post_id)
+        return job, False
+    return job, True
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок постов из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов; 1 - без пула, в текущем процессе.'
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза при пустой очереди, секунд.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Сначала поставить в очередь посты без готовых миниатюр '
+                 'и вернуть в неё задачи, исчерпавшие попытки.'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            retried = ThumbnailJob.objects.filter(
+                attempts__gte=MAX_ATTEMPTS).update(attempts=0)
+            queued = backfill(options['batch_size'])
+            self.stdout.write(
+                f'Возвращено в очередь: {retried}, '
+                f'постов без миниатюр: {queued}'
+            )
+        pool = None
+        if options['processes'] > 1:
+            # Дочерние процессы открывают собственные соединения с БД.
+            connections.close_all()
+            pool = multiprocessing.Pool(options['processes'])
+        done = 0
+        try:
+            while True:
+                jobs = list(
+                    ThumbnailJob.objects.filter(attempts__lt=MAX_ATTEMPTS)
+                    .order_by('created')
+                    .values_list('pk', 'post_id', 'created')
+                    [:options['batch_size']]
+                )
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                results = (
+                    pool.imap_unordered(process, jobs) if pool
+                    else map(process, jobs)
+                )
+                for (pk, post_id, created), ok in results:
+                    # Пост могли снова отредактировать, пока шла генерация.
+                    job = ThumbnailJob.objects.filter(pk=pk, created=created)
+                    if ok:
+                        done += job.delete()[0]
+                    else:
+                        job.update(attempts=F('attempts') + 1)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {done}'
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now=True, verbose_name='Дата постановки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnail_job', to='posts.Post')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def rebuild_timelines(apps, schema_editor):
+    # Ленты и счётчики появились в 0010 и 0011 пустыми: без этого
+    # подписки, существовавшие до них, не видны в /follow/. Команда
+    # работает с текущими моделями, поэтому при изменении схемы
+    # posts_timelineentry или posts_authorstats эту миграцию нужно
+    # переписать или объединить со старыми.
+    call_command('rebuild_timelines', stdout=StringIO())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_feed_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_timelines, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,36 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 
 
 User = get_user_model()
 
 
+class CountedModel(models.Model):
+    """Модель, изменения которой сдвигают счётчики AuthorStats.
+
+    Счётчики меняют обработчики post_save и post_delete, поэтому запись
+    и обработчики выполняются в одной транзакции: при ошибке откатятся
+    и строка, и счётчики.
+    """
+
+    class Meta:
+        abstract = True
+
+    def _atomic(self, using):
+        return transaction.atomic(
+            using=using or router.db_for_write(type(self), instance=self)
+        )
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        with self._atomic(using):
+            super().save(force_insert, force_update, using, update_fields)
+
+    def delete(self, using=None, keep_parents=False):
+        with self._atomic(using):
+            return super().delete(using, keep_parents)
+
+
 class Group(models.Model):
     title = models.CharField('Заголовок', max_length=200)
     slug = models.SlugField(unique=True)
@@ -18,7 +44,23 @@ class Group(models.Model):
         verbose_name_plural = ('Группы')
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Всё, что карточке поста нужно от автора и группы, одним JOIN."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__title', 'group__slug', 'group__description',
+        )
+
+    def estimated_count(self):
+        """Оценка числа постов по наибольшему id: один шаг по первичному
+        ключу вместо COUNT(*). Удалённые посты её завышают.
+        """
+        return self.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+class Post(CountedModel):
     text = models.TextField('Текст')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     author = models.ForeignKey(
@@ -38,16 +80,32 @@ class Post(models.Model):
         blank=True
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text
 
     class Meta:
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
-        ordering = ["-pub_date"]
-
-
-class Comment(models.Model):
+        ordering = ["-pub_date", "-pk"]
+        # id в конце индексов — второй ключ курсора (pub_date, id).
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
+
+
+class Comment(CountedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.SET_NULL,
@@ -63,13 +121,19 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     user = models.ForeignKey(
         User,
         related_name="follower",
-        on_delete=None
+        on_delete=models.CASCADE
     )
     author = models.ForeignKey(
         User,
@@ -77,5 +141,65 @@ class Follow(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
     def __str__(self):
         return f"Фолловер: '{self.user}', Автор: '{self.author}'"
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries"
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    posts = models.PositiveIntegerField('Постов', default=0)
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+    comments = models.PositiveIntegerField('Комментариев', default=0)
+
+    def __str__(self):
+        return f"Счётчики пользователя '{self.user_id}'"
+
+
+class ThumbnailJob(models.Model):
+    """Пост, для картинки которого нужно подготовить миниатюры."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="thumbnail_job"
+    )
+    created = models.DateTimeField('Дата постановки', auto_now=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
@@ -0,0 +1,295 @@
+import base64
+import collections.abc
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.replicas import primary_reads
+
+from . import feed_cache
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def pack(*values):
+    """Упаковывает значения в непрозрачный токен для URL."""
+    raw = '|'.join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def unpack(token):
+    """Обратная к pack операция; ValueError для битого токена."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Некорректный токен')
+
+
+def encode_cursor(direction, post, field='pub_date', key='pk'):
+    """Упаковывает позицию (дата, id) в непрозрачный токен.
+
+    post — объект модели или словарь из values() с ключами field и key
+    (id вместо pk).
+    """
+    if isinstance(post, dict):
+        return pack(
+            direction, post[field].isoformat(),
+            post['id' if key == 'pk' else key],
+        )
+    return pack(
+        direction, getattr(post, field).isoformat(), getattr(post, key)
+    )
+
+
+def decode_cursor(token):
+    """Возвращает (direction, дата, pk) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        direction, pub_date, pk = unpack(token)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except ValueError:
+        return None
+    if direction not in (FORWARD, BACKWARD) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def normalize_cursor(token):
+    """Канонический токен той же позиции; '' для первой страницы и битого
+    курсора, которые get_page() показывает одинаково.
+    """
+    position = decode_cursor(token)
+    if position is None:
+        return ''
+    direction, value, pk = position
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.utc)
+    return pack(direction, value.isoformat(), pk)
+
+
+class CursorPage(collections.abc.Sequence):
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(
+            FORWARD, self.object_list[-1], self.paginator.field,
+            self.paginator.key,
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return encode_cursor(
+            BACKWARD, self.object_list[0], self.paginator.field,
+            self.paginator.key,
+        )
+
+
+class CursorPaginator:
+    """Постраничный вывод по ключу (field, key) без COUNT и OFFSET.
+
+    Каждая страница читается одним диапазонным запросом по индексу,
+    поэтому стоимость не зависит от глубины листания.
+    """
+    is_cursor = True
+    field = 'pub_date'
+    key = 'pk'
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def queryset(self, position):
+        """Запрос страницы для позиции из decode_cursor() или None.
+
+        Условие записано как field <= value AND (field < value OR
+        key < pk), а не через одно OR: так его диапазон по field
+        читается индексом, а не собирается из двух с сортировкой.
+        """
+        field, key = self.field, self.key
+        if position is None:
+            return self.object_list.order_by(f'-{field}', f'-{key}')
+        direction, value, pk = position
+        if direction == FORWARD:
+            return self.object_list.filter(
+                Q(**{f'{field}__lte': value}),
+                Q(**{f'{field}__lt': value}) | Q(**{f'{key}__lt': pk}),
+            ).order_by(f'-{field}', f'-{key}')
+        return self.object_list.filter(
+            Q(**{f'{field}__gte': value}),
+            Q(**{f'{field}__gt': value}) | Q(**{f'{key}__gt': pk}),
+        ).order_by(field, key)
+
+    def get_page(self, token):
+        position = decode_cursor(token)
+        posts = self._fetch(self.queryset(position))
+        if position is None:
+            has_next = len(posts) > self.per_page
+            return CursorPage(posts[:self.per_page], self, has_next, False)
+        if position[0] == FORWARD:
+            has_next = len(posts) > self.per_page
+            return CursorPage(posts[:self.per_page], self, has_next, True)
+        if len(posts) <= self.per_page:
+            return self.get_page(None)
+        return CursorPage(posts[:self.per_page][::-1], self, True, True)
+
+    def _fetch(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+
+class CommentPaginator(CursorPaginator):
+    """Комментарии от новых к старым по индексу (post, created)."""
+    field = 'created'
+
+
+class FollowPaginator(CursorPaginator):
+    """Лента подписок по полям записи ленты, которые follow_posts()
+    добавляет к постам: так страницы читаются индексом ленты.
+    """
+    field = 'feed_date'
+    key = 'feed_id'
+
+
+class FeedPaginator(Paginator):
+    """Paginator ленты без COUNT(*) на каждый запрос.
+
+    Число постов кэшируется под поколениями областей ленты scopes
+    и сбрасывается вместе с ними при записи. Если число уже известно
+    (например, из AuthorStats), его передают в count. Для огромных
+    таблиц estimate() даёт быструю оценку: когда она не меньше
+    PAGINATOR_ESTIMATE_THRESHOLD, точный подсчёт не выполняется.
+
+    Оценка бывает завышена, поэтому с ней (approximate) страница дальше
+    первой проверяется на наличие постов, ссылок на хвост ленты нет,
+    а страница за её концом — 404.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, scopes=(), count=None,
+                 estimate=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scopes = scopes
+        self.known_count = count
+        self.estimate = estimate
+        self.approximate = False
+
+    def _count_key(self):
+        parts = [
+            f'{scope}.{generation}' for scope, generation in
+            zip(self.scopes, feed_cache.generations(*self.scopes))
+        ]
+        return 'feed_count:' + ':'.join(parts)
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if not self.scopes:
+            return super().count
+        key = self._count_key()
+        cached = cache.get(key)
+        if cached is None:
+            with primary_reads():
+                cached = self._compute_count()
+            cache.set(key, cached, settings.FEED_CACHE_TIMEOUT)
+        count, self.approximate = cached
+        return count
+
+    def validate_number(self, number):
+        number = super().validate_number(number)
+        if self.approximate and number > 1 and not self.page_exists(number):
+            raise EmptyPage('Страница за концом ленты')
+        return number
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            if self.approximate:
+                raise Http404('Страница за концом ленты')
+            number = self.num_pages
+        return self.page(number)
+
+    def page_exists(self, number):
+        """Есть ли на странице number хоть один пост; ответ кэшируется
+        вместе с числом постов.
+        """
+        key = f'{self._count_key()}:page:{number}'
+        exists = cache.get(key)
+        if exists is None:
+            bottom = (number - 1) * self.per_page
+            with primary_reads():
+                exists = self.object_list[bottom:bottom + 1].exists()
+            cache.set(key, exists, settings.FEED_CACHE_TIMEOUT)
+        return exists
+
+    def _compute_count(self):
+        estimated = self.estimate() if self.estimate else None
+        if (
+            estimated is not None
+            and estimated >= settings.PAGINATOR_ESTIMATE_THRESHOLD
+        ):
+            return estimated, True
+        return super().count, False
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+        number = self.validate_number(number)
+        # С оценкой неизвестно, где кончается лента: только страницы
+        # до текущей, без хвоста.
+        last = number if self.approximate else self.num_pages
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from range(1, last + 1)
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if last == number:
+            return
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
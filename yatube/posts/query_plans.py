@@ -0,0 +1,68 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Post
+from .paginators import BACKWARD, FORWARD, CursorPaginator, FollowPaginator
+from .timeline import feed_posts, follow_posts
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def page_queries(name, queryset, paginator_class=CursorPaginator):
+    """Запросы ленты для номерной страницы и курсоров без позиции,
+    вперёд и назад.
+    """
+    per_page = settings.PAGINATOR_PAGES
+    paginator = paginator_class(queryset, per_page)
+    position = timezone.now(), 0
+    return {
+        name: queryset[:per_page],
+        f'{name} cursor': paginator.queryset(None)[:per_page + 1],
+        f'{name} next': paginator.queryset(
+            (FORWARD, *position))[:per_page + 1],
+        f'{name} previous': paginator.queryset(
+            (BACKWARD, *position))[:per_page + 1],
+    }
+
+
+def feed_queries(user, group, celebrity=None):
+    """Запросы страниц лент в том виде, в каком их строят представления.
+
+    celebrity — автор с подписчиками сверх TIMELINE_FANOUT_LIMIT: лента
+    подписок с ним строится отдельной веткой follow_posts().
+    """
+    queries = {}
+    queries.update(page_queries('index', Post.objects.for_feed()))
+    queries.update(page_queries('group_posts', group.posts.for_feed()))
+    queries.update(page_queries('profile', user.posts.for_feed()))
+    queries.update(page_queries(
+        'follow_index', follow_posts(user).for_feed(), FollowPaginator
+    ))
+    if celebrity is not None:
+        queries.update(page_queries(
+            'follow_index celebrities',
+            feed_posts(user, [celebrity.pk]).for_feed(), FollowPaginator,
+        ))
+    return queries
+
+
+def explain(queryset):
+    """Строки EXPLAIN QUERY PLAN для запроса (только SQLite)."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def problems(plan):
+    """Шаги плана с полным проходом таблицы или сортировкой во временном
+    B-дереве.
+    """
+    return [
+        step for step in plan
+        if TEMP_SORT in step or FULL_SCAN.match(step)
+    ]
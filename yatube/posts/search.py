@@ -0,0 +1,106 @@
+import re
+
+from django.db import connections, router
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import pack, unpack
+
+# Управляющие символы не встречаются в тексте постов и переживают
+# экранирование HTML, поэтому ими удобно размечать совпадения.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SEARCH_SQL = (
+    "SELECT rowid, rank, "
+    "snippet(posts_post_fts, 0, %s, %s, '…', 16) "
+    "FROM posts_post_fts WHERE posts_post_fts MATCH %s {where} "
+    "ORDER BY rank, rowid LIMIT %s"
+)
+AFTER_SQL = "AND (rank > %s OR (rank = %s AND rowid > %s))"
+
+
+def match_expression(query):
+    """Переводит пользовательский ввод в безопасный запрос FTS5.
+
+    Каждое слово берётся в кавычки, последнее ищется по префиксу.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search(query, per_page, cursor=None):
+    """Страница найденных постов по релевантности (bm25) с подсветкой.
+
+    Пагинация по ключу (rank, rowid), поэтому глубокие страницы
+    не дороже первой.
+    """
+    match = match_expression(query)
+    if not match:
+        return SearchPage([], None)
+    where, params = '', []
+    if cursor:
+        try:
+            rank, pk = unpack(cursor)
+            rank, pk = float(rank), int(pk)
+        except ValueError:
+            pass
+        else:
+            where, params = AFTER_SQL, [rank, rank, pk]
+    with connections[router.db_for_read(Post)].cursor() as db:
+        db.execute(
+            SEARCH_SQL.format(where=where),
+            [MARK_START, MARK_END, match, *params, per_page + 1],
+        )
+        rows = db.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = pack(repr(rows[-1][1]), rows[-1][0])
+    posts = Post.objects.for_feed().in_bulk([pk for pk, _, _ in rows])
+    object_list = []
+    for pk, _, snippet in rows:
+        if pk in posts:
+            posts[pk].snippet = highlight(snippet)
+            object_list.append(posts[pk])
+    return SearchPage(object_list, next_cursor)
+
+
+def filter_posts(queryset, query):
+    """Ограничивает queryset постами, подходящими под запрос."""
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+        [match],
+    ))
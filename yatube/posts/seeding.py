@@ -0,0 +1,287 @@
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import feed_cache
+from .importing import batched
+from .models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+from .timeline import timeline_sql
+
+User = get_user_model()
+
+WORDS = (
+    'город утро дорога письмо окно река лес дом вечер друг книга поезд '
+    'море небо свет ветер зима лето осень весна кофе музыка работа сад '
+    'новый старый тихий долгий первый последний светлый тёмный быстрый '
+    'идти читать писать думать смотреть ждать помнить слушать говорить '
+    'сегодня вчера завтра снова вместе далеко рядом очень почти всегда'
+).split()
+TEXT_POOL = 4096
+
+# Ранг выбирается как int(n * u ** skew): доля выборов, попадающих
+# в первые k рангов, равна (k / n) ** (1 / skew). Чем больше skew,
+# тем сильнее всё достаётся немногим первым.
+FOLLOW_SKEW = 3.0
+ACTIVITY_SKEW = 2.0
+GROUP_SKEW = 3.0
+COMMENT_SKEW = 2.0
+NO_GROUP_SHARE = 0.3
+
+FTS_SQL = (
+    'INSERT INTO posts_post_fts(rowid, text) '
+    'SELECT id, text FROM {post} WHERE id >= %s'
+)
+
+
+def skewed(rng, n, skew):
+    """Ранг от 0 до n - 1 со степенным распределением."""
+    return min(int(n * rng.random() ** skew), n - 1)
+
+
+def next_id(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Убирает на время массовой вставки вторичные индексы и триггеры
+    таблиц и затем создаёт их заново: построить индекс по готовой
+    таблице намного быстрее, чем обновлять его на каждой строке.
+
+    Работает только на SQLite, на других базах ничего не делает.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    quote = connection.ops.quote_name
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') AND sql IS NOT NULL "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        saved = cursor.fetchall()
+        for kind, name, _ in saved:
+            cursor.execute(f'DROP {kind.upper()} {quote(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, _, sql in saved:
+                cursor.execute(sql)
+
+
+class Seeder:
+    """Генерирует синтетических пользователей, группы, подписки, посты
+    и комментарии для нагрузочных замеров.
+
+    Строки пишутся executemany с явными первичными ключами пачками
+    в отдельных транзакциях, индексы строятся после вставки. Модели
+    и сигналы не участвуют, поэтому счётчики, поисковый индекс и ленты
+    подписок заполняются здесь же, а не обработчиками. Одно и то же
+    зерно даёт те же данные; даты отсчитываются от until.
+    """
+
+    def __init__(self, seed, prefix='seed', days=365, until=None,
+                 batch_size=20000, progress=None):
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.until = timezone.make_naive(until or timezone.now(), timezone.utc)
+        self.span = days * 86400
+        self.batch_size = batch_size
+        self.progress = progress or (lambda table, written, started: None)
+        self.texts = [self.sentence(5, 40) for _ in range(TEXT_POOL)]
+
+    def sentence(self, shortest, longest):
+        words = self.rng.choices(WORDS, k=self.rng.randint(shortest, longest))
+        return ' '.join(words).capitalize() + '.'
+
+    def moment(self, age):
+        """Дата, отстоящая от until на долю age от всего периода."""
+        return str(self.until - timedelta(seconds=age * self.span))
+
+    def insert(self, model, fields, rows):
+        meta = model._meta
+        quote = connection.ops.quote_name
+        columns = ', '.join(
+            quote(meta.get_field(name).column) for name in fields
+        )
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = (
+            f'INSERT INTO {quote(meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})'
+        )
+        written = 0
+        started = time.monotonic()
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            written += len(batch)
+            self.progress(meta.db_table, written, started)
+        return written
+
+    def run(self, users, groups, posts, comments, follows, timelines=True):
+        """Заполняет базу и возвращает число строк по таблицам."""
+        self.users = users
+        self.first_user = next_id(User)
+        self.first_group = next_id(Group)
+        self.first_post = next_id(Post)
+        self.counters = {
+            name: array('l', [0]) * users
+            for name in ('posts', 'followers', 'following', 'comments')
+        }
+        written = {}
+        with deferred_indexes(User, Group, Follow, Post, Comment, AuthorStats):
+            written['users'] = self.insert(User, (
+                'id', 'password', 'is_superuser', 'username', 'first_name',
+                'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+            ), self.user_rows())
+            written['groups'] = self.insert(
+                Group, ('id', 'title', 'slug', 'description'),
+                self.group_rows(groups),
+            )
+            written['follows'] = self.insert(
+                Follow, ('user', 'author'), self.follow_rows(follows)
+            )
+            written['posts'] = self.insert(
+                Post, ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+                self.post_rows(posts, groups),
+            )
+            if posts:
+                written['comments'] = self.insert(
+                    Comment, ('post', 'author', 'text', 'created'),
+                    self.comment_rows(comments, posts),
+                )
+            self.insert(AuthorStats, (
+                'user', 'posts', 'followers', 'following', 'comments'
+            ), self.stats_rows())
+            if connection.vendor == 'sqlite':
+                # Триггер поискового индекса снят вместе с индексами.
+                self.execute(FTS_SQL, [self.first_post])
+        if timelines:
+            with deferred_indexes(TimelineEntry):
+                written['timelines'] = self.fill_timelines()
+        feed_cache.bump('index')
+        return written
+
+    def execute(self, sql, params):
+        quote = connection.ops.quote_name
+        sql = sql.format(**{
+            name: quote(model._meta.db_table) for name, model in (
+                ('timeline', TimelineEntry), ('follow', Follow),
+                ('stats', AuthorStats), ('post', Post),
+            )
+        })
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def user_rows(self):
+        joined = str(self.until)
+        for i in range(self.users):
+            yield (
+                self.first_user + i, '!', False, f'{self.prefix}{i}',
+                '', '', '', False, True, joined,
+            )
+
+    def group_rows(self, groups):
+        for i in range(groups):
+            yield (
+                self.first_group + i, f'Группа {self.prefix} {i}',
+                f'{self.prefix}-{i}', self.sentence(3, 12),
+            )
+
+    def follow_rows(self, follows):
+        """Число подписок у пользователя распределено экспоненциально,
+        а выбор автора — степенно: у немногих авторов огромная аудитория.
+        """
+        rng, users = self.rng, self.users
+        if users < 2:
+            return
+        average = follows / users
+        followers = self.counters['followers']
+        following = self.counters['following']
+        for user in range(users):
+            wanted = min(int(rng.expovariate(1) * average), users - 1)
+            authors = set()
+            attempts = 0
+            while len(authors) < wanted and attempts < 3 * wanted:
+                attempts += 1
+                author = skewed(rng, users, FOLLOW_SKEW)
+                if author != user:
+                    authors.add(author)
+            following[user] = len(authors)
+            for author in sorted(authors):
+                followers[author] += 1
+                yield self.first_user + user, self.first_user + author
+
+    def post_rows(self, posts, groups):
+        rng, users = self.rng, self.users
+        # Активность пишущих не совпадает с популярностью у подписчиков.
+        activity = list(range(users))
+        rng.shuffle(activity)
+        counts = self.counters['posts']
+        for i in range(posts):
+            author = activity[skewed(rng, users, ACTIVITY_SKEW)]
+            counts[author] += 1
+            group = None
+            if groups and rng.random() >= NO_GROUP_SHARE:
+                group = self.first_group + skewed(rng, groups, GROUP_SKEW)
+            # Посты идут в хронологическом порядке, как на живом сайте:
+            # индекс по дате дописывается в конец, а не вразброс.
+            yield (
+                self.first_post + i, rng.choice(self.texts),
+                self.moment((posts - i - rng.random()) / posts),
+                self.first_user + author, group, '',
+            )
+
+    def comment_rows(self, comments, posts):
+        rng, users = self.rng, self.users
+        counts = self.counters['comments']
+        for _ in range(comments):
+            post = skewed(rng, posts, COMMENT_SKEW)
+            author = rng.randrange(users)
+            counts[author] += 1
+            # Комментарий оставлен позже поста.
+            yield (
+                self.first_post + post, self.first_user + author,
+                rng.choice(self.texts),
+                self.moment((posts - post - 1) / posts * rng.random()),
+            )
+
+    def stats_rows(self):
+        counters = self.counters
+        for i in range(self.users):
+            yield (
+                self.first_user + i, counters['posts'][i],
+                counters['followers'][i], counters['following'][i],
+                counters['comments'][i],
+            )
+
+    def fill_timelines(self):
+        """Материализует ленты подписок так же, как backfill() после
+        подписки: последние TIMELINE_LENGTH постов авторов, кроме тех,
+        у кого подписчиков больше TIMELINE_FANOUT_LIMIT.
+        """
+        written = 0
+        started = time.monotonic()
+        step = max(self.batch_size // 100, 1)
+        last_user = self.first_user + self.users - 1
+        sql = timeline_sql('f.user_id BETWEEN %s AND %s')
+        for first in range(self.first_user, last_user + 1, step):
+            written += self.execute(sql, [
+                first, min(first + step - 1, last_user),
+                settings.TIMELINE_FANOUT_LIMIT, settings.TIMELINE_LENGTH,
+            ])
+            self.progress(TimelineEntry._meta.db_table, written, started)
+        return written
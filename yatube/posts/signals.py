@@ -0,0 +1,108 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import feed_cache, follow_cache, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = None
+    if instance.pk is not None:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if previous is not None:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'posts', 1)
+        # Раскладка по тысячам лент не должна удерживать блокировку
+        # записи; она идёт после фиксации и до повторного сдвига
+        # поколений в bump().
+        transaction.on_commit(lambda: timeline.fan_out(instance))
+    feed_cache.bump(*feed_cache.post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+    # Миниатюры строит thumbnail_worker; очередь пополняется при любом
+    # сохранении с новой картинкой, не только из формы.
+    if instance.image and instance.image.name != getattr(
+        instance, '_previous_image', None
+    ):
+        thumbnails.enqueue(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+    stats.change(instance.author_id, 'posts', -1)
+
+
+def group_author_ids(group):
+    return list(
+        Post.objects.filter(group=group).order_by()
+        .values_list('author_id', flat=True).distinct()
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты отвязываются от группы UPDATE без сигналов, и после
+    # удаления их авторов уже не найти.
+    instance._author_ids = group_author_ids(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Ссылки на группу есть и во фрагментах профилей её авторов."""
+    author_ids = getattr(instance, '_author_ids', None)
+    if author_ids is None:
+        author_ids = group_author_ids(instance)
+    feed_cache.bump(
+        'index', f'group:{instance.pk}',
+        *(f'profile:{author_id}' for author_id in author_ids)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    feed_cache.bump(
+        f'follow:{instance.user_id}', f'profile:{instance.author_id}'
+    )
+    if created:
+        follow_cache.invalidate(instance.user_id)
+        stats.change(instance.author_id, 'followers', 1)
+        stats.change(instance.user_id, 'following', 1)
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed_cache.bump(
+        f'follow:{instance.user_id}', f'profile:{instance.author_id}'
+    )
+    follow_cache.invalidate(instance.user_id)
+    stats.change(instance.author_id, 'followers', -1)
+    stats.change(instance.user_id, 'following', -1)
+    timeline.unfollow(instance)
+    timeline.restore(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    feed_cache.bump(f'post:{instance.post_id}')
+    if created:
+        stats.change(instance.author_id, 'comments', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    feed_cache.bump(f'post:{instance.post_id}')
+    stats.change(instance.author_id, 'comments', -1)
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+COUNTERS = {
+    'posts': (Post, 'author'),
+    'followers': (Follow, 'author'),
+    'following': (Follow, 'user'),
+    'comments': (Comment, 'author'),
+}
+
+
+def get_stats(user):
+    """Счётчики пользователя; при отсутствии записи пересчитывает её."""
+    try:
+        return AuthorStats.objects.get(user_id=user.pk)
+    except AuthorStats.DoesNotExist:
+        recompute([user.pk])
+        return AuthorStats.objects.get(user_id=user.pk)
+
+
+def change(user_id, counter, delta):
+    """Атомарно сдвигает счётчик; недостающая запись строится с нуля."""
+    with transaction.atomic():
+        updated = AuthorStats.objects.filter(user_id=user_id).update(
+            **{counter: F(counter) + delta}
+        )
+        if not updated and delta > 0:
+            recompute([user_id])
+
+
+def recompute(user_ids):
+    """Пересчитывает счётчики пачки пользователей агрегирующими запросами."""
+    user_ids = list(user_ids)
+    values = {pk: {} for pk in user_ids}
+    for counter, (model, field) in COUNTERS.items():
+        rows = (
+            model.objects.filter(**{f'{field}__in': user_ids})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values_list(field, 'total')
+        )
+        for pk, total in rows:
+            values[pk][counter] = total
+    with transaction.atomic():
+        existing = set(
+            AuthorStats.objects.filter(user_id__in=user_ids).values_list(
+                'user_id', flat=True
+            )
+        )
+        objects = [
+            AuthorStats(
+                user_id=pk,
+                **{counter: values[pk].get(counter, 0) for counter in COUNTERS}
+            )
+            for pk in user_ids
+        ]
+        AuthorStats.objects.bulk_update(
+            [stats for stats in objects if stats.user_id in existing],
+            list(COUNTERS),
+        )
+        AuthorStats.objects.bulk_create(
+            [stats for stats in objects if stats.user_id not in existing],
+            ignore_conflicts=True,
+        )
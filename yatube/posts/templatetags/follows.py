@@ -0,0 +1,17 @@
+from django import template
+
+from posts.follow_cache import is_following
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def followed_authors(context, objects):
+    """Id авторов из списка, на которых подписан текущий пользователь.
+
+    objects — посты, комментарии или сами пользователи; проверка идёт
+    одним чтением кэша: {% followed_authors page_obj as followed %}.
+    """
+    author_ids = {getattr(obj, 'author_id', obj.pk) for obj in objects}
+    following = is_following(context['request'].user, author_ids)
+    return {author_id for author_id, yes in following.items() if yes}
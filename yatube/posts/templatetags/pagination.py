@@ -0,0 +1,23 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    """Окно номеров страниц вокруг текущей вместо полного page_range."""
+    paginator = page.paginator
+    if hasattr(paginator, 'get_elided_page_range'):
+        return list(paginator.get_elided_page_range(page.number))
+    return paginator.page_range
+
+
+@register.filter
+def has_next_page(page):
+    """has_next(), который при оценочном числе постов проверяет, что
+    следующая страница не пуста.
+    """
+    paginator = page.paginator
+    if getattr(paginator, 'approximate', False):
+        return paginator.page_exists(page.number + 1)
+    return page.has_next()
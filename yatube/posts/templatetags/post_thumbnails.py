@@ -0,0 +1,40 @@
+from django import template
+from django.conf import settings
+
+from core import timing
+from posts.thumbnails import backend
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry=None, **options):
+    """Готовая миниатюра или None, пока её не построил thumbnail_worker.
+
+    Без geometry берётся первый размер из POST_THUMBNAILS — тот, что
+    показывают карточки постов.
+    """
+    if not image:
+        return None
+    if geometry is None:
+        geometry, defaults = settings.POST_THUMBNAILS[0]
+        options = {**defaults, **options}
+    with timing.measure('thumbnail'):
+        return backend.get_ready_thumbnail(image, geometry, **options)
+
+
+@register.simple_tag
+def thumbnail_ratio():
+    """Пропорции заглушки на месте миниатюры для CSS aspect-ratio."""
+    width, _, height = settings.POST_THUMBNAILS[0][0].partition('x')
+    if not width or not height:
+        return 'auto'
+    return f'{width} / {height}'
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts):
+    """Пакетная загрузка миниатюр перед циклом по постам страницы."""
+    with timing.measure('thumbnail'):
+        backend.prefetch(posts)
+    return ''
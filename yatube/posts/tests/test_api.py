@@ -0,0 +1,100 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGINATOR_PAGES=3)
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(title='Группа', slug='group')
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}',
+                group=self.group if i % 2 else None,
+            )
+            for i in range(7)
+        ]
+        self.client = Client()
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        return response.status_code, json.loads(response.content)
+
+    def test_cursor_walks_whole_feed(self):
+        url = reverse('posts:api_index')
+        texts, cursor = [], None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            status, data = self.get_json(url, **params)
+            self.assertEqual(status, 200)
+            texts += [item['text'] for item in data['results']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(texts, [f'Пост {i}' for i in reversed(range(7))])
+
+    def test_sparse_fieldsets(self):
+        url = reverse('posts:api_group_posts', kwargs={'slug': 'group'})
+        status, data = self.get_json(url, fields='id,group')
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            data['results'][0], {'id': self.posts[5].pk, 'group': 'group'}
+        )
+        status, data = self.get_json(url, fields='id,password')
+        self.assertEqual(status, 400)
+        self.assertIn('password', data['error'])
+
+    def test_profile_and_detail(self):
+        Comment.objects.create(
+            author=self.reader, post=self.posts[0], text='Комментарий'
+        )
+        status, data = self.get_json(
+            reverse('posts:api_profile', kwargs={'username': 'author'}),
+            fields='author',
+        )
+        self.assertEqual(data['results'][0], {'author': 'author'})
+        status, data = self.get_json(reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.posts[0].pk}
+        ))
+        self.assertEqual(data['post']['text'], 'Пост 0')
+        self.assertIsNone(data['post']['image'])
+        self.assertEqual(data['comments'][0]['author'], 'reader')
+        status, data = self.get_json(
+            reverse('posts:api_profile', kwargs={'username': 'ghost'})
+        )
+        self.assertEqual(status, 404)
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('posts:api_follow_index')
+        status, data = self.get_json(url)
+        self.assertEqual(status, 401)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        status, data = self.get_json(url)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['results'][0]['text'], 'Пост 6')
+
+    def test_feed_is_one_query_and_compressible(self):
+        url = reverse('posts:api_index')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 3)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,81 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.query_plans import explain, problems
+from posts.views import comment_page
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PAGE=5)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other = Post.objects.create(author=cls.author, text='Другой')
+        for i in range(12):
+            Comment.objects.create(
+                author=cls.author, post=cls.post, text=f'Комментарий {i}'
+            )
+        Comment.objects.create(
+            author=cls.author, post=cls.other, text='Чужой комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_detail_renders_newest_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Комментарий {i}' for i in range(11, 6, -1)],
+        )
+        self.assertContains(response, comments.next_cursor)
+        self.assertNotContains(response, 'Комментарий 6<')
+
+    def test_fragment_loads_remaining_pages(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        texts, cursor = [], None
+        while True:
+            page = comment_page(self.post.pk, cursor)
+            texts += [comment.text for comment in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertEqual(len(texts), 12)
+        self.assertEqual(len(set(texts)), 12)
+        self.assertNotIn('Чужой комментарий', texts)
+
+    def test_api_comments_are_paged(self):
+        url = reverse(
+            'posts:api_post_detail', kwargs={'post_id': self.post.pk}
+        )
+        data = json.loads(self.client.get(url).content)
+        self.assertEqual(len(data['comments']), 5)
+        url = reverse(
+            'posts:api_post_comments', kwargs={'post_id': self.post.pk}
+        )
+        data = json.loads(
+            self.client.get(url, {'cursor': data['next']}).content
+        )
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий 6')
+
+    def test_comment_page_uses_index(self):
+        queryset = Comment.objects.filter(post_id=self.post.pk).order_by(
+            '-created', '-pk')[:6]
+        plan = explain(queryset)
+        self.assertEqual(problems(plan), [], plan)
+        self.assertIn('comment_post_created_idx', ' '.join(plan))
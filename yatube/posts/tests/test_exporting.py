@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        group = Group.objects.create(title='Группа', slug='group')
+        self.post = Post.objects.create(
+            author=self.author, text='Пост с картинкой', group=group,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        Post.objects.create(author=self.other, text='Чужой пост')
+        Comment.objects.create(
+            author=self.author, post=self.post, text='Мой комментарий'
+        )
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse(
+            'posts:profile_export', kwargs={'username': 'author'}
+        )
+
+    def test_jsonl_export_streams_own_rows(self):
+        response = self.client.get(self.url)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['text']) for row in rows],
+            [('post', 'Пост с картинкой'), ('comment', 'Мой комментарий')],
+        )
+        self.assertEqual(rows[0]['group__slug'], 'group')
+
+    def test_zip_export_contains_images(self):
+        response = self.client.get(self.url, {'format': 'zip'})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        self.assertIn('Пост с картинкой', archive.read('posts.jsonl').decode())
+        self.assertIn(
+            'Мой комментарий', archive.read('comments.jsonl').decode()
+        )
+        image = os.path.join('images', self.post.image.name)
+        self.assertEqual(archive.read(image), SMALL_GIF)
+
+    def test_export_of_other_user_is_forbidden(self):
+        self.client.force_login(self.other)
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, reverse('posts:profile', kwargs={'username': 'author'})
+        )
+
+    def test_command_writes_file(self):
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_content', 'author', path, stdout=StringIO())
+        with open(path, encoding='utf-8') as stream:
+            self.assertEqual(len(stream.readlines()), 2)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import follow_cache
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(4)
+        ]
+        for author in self.authors[2:0:-1]:
+            Follow.objects.create(user=self.reader, author=author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_batch_lookup(self):
+        ids = [author.pk for author in self.authors]
+        self.assertEqual(
+            follow_cache.is_following(self.reader, self.authors),
+            dict(zip(ids, [False, True, True, False])),
+        )
+        self.assertEqual(
+            follow_cache.is_following(AnonymousUser(), ids),
+            dict.fromkeys(ids, False),
+        )
+
+    def test_follow_and_unfollow_invalidate(self):
+        author = self.authors[3]
+        follow_cache.followed_ids(self.reader.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_cache.is_following(self.reader, [author])[author.pk]
+            )
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': author.username}
+        ))
+        # Набор сброшен и один раз перечитывается из базы.
+        with self.assertNumQueries(1):
+            self.assertTrue(
+                follow_cache.is_following(self.reader, [author])[author.pk]
+            )
+        with self.assertNumQueries(0):
+            follow_cache.followed_ids(self.reader.pk)
+        self.assertEqual(
+            list(follow_cache.followed_ids(self.reader.pk)),
+            sorted(a.pk for a in self.authors[1:]),
+        )
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': author.username}
+        ))
+        self.assertFalse(
+            follow_cache.is_following(self.reader, [author])[author.pk]
+        )
+
+    def test_profile_reflects_viewer_following(self):
+        followed = reverse(
+            'posts:profile', kwargs={'username': self.authors[1].username}
+        )
+        other = reverse(
+            'posts:profile', kwargs={'username': self.authors[0].username}
+        )
+        self.assertTrue(self.client.get(followed).context['following'])
+        self.assertFalse(self.client.get(other).context['following'])
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(other)
+        self.assertFalse(
+            [q for q in context.captured_queries if 'posts_follow' in q['sql']]
+        )
+
+    def test_followed_authors_tag(self):
+        posts = [
+            Post.objects.create(author=author, text='Пост')
+            for author in self.authors
+        ]
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        rendered = Template(
+            '{% load follows %}{% followed_authors posts as followed %}'
+            '{% for post in posts %}'
+            '{% if post.author_id in followed %}+{% else %}-{% endif %}'
+            '{% endfor %}'
+        ).render(Context({'request': request, 'posts': posts}))
+        self.assertEqual(rendered, '-++-')
@@ -0,0 +1,125 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Follow, Group, Post, ThumbnailJob
+from posts.stats import get_stats
+from posts.timeline import follow_posts
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    def write_jsonl(self, records):
+        return self.write_file(
+            '.jsonl', '\n'.join(json.dumps(record) for record in records)
+        )
+
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+            stream.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command(
+            'import_content', *args, '--batch-size', '2',
+            stdout=out, stderr=StringIO()
+        )
+        return out.getvalue()
+
+    def test_import_groups_posts_and_follows(self):
+        groups = self.write_jsonl([
+            {'slug': 'cats', 'title': 'Кошки', 'description': 'Про кошек'},
+            {'slug': 'dogs', 'title': 'Собаки'},
+        ])
+        posts = self.write_jsonl([
+            {'author': 'anna', 'text': 'Первый', 'group': 'cats',
+             'pub_date': '2020-01-02T03:04:05+00:00'},
+            {'author': 'anna', 'text': 'Второй'},
+            {'author': 'boris', 'text': 'Третий', 'group': 'dogs'},
+            {'author': 'boris', 'text': 'Нет группы', 'group': 'fish'},
+            {'author': 'boris', 'text': ''},
+        ])
+        follows = self.write_file(
+            '.csv', 'user,author\nboris,anna\nanna,anna\nboris,anna\n'
+        )
+        self.run_import('groups', groups)
+        output = self.run_import('posts', posts, '--create-users')
+        self.run_import('follows', follows)
+
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertIn('пропущено 2', output)
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group.slug, 'cats')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(Follow.objects.count(), 1)
+
+        anna = User.objects.get(username='anna')
+        self.assertFalse(anna.has_usable_password())
+        self.assertEqual(get_stats(anna).posts, 2)
+        self.assertEqual(get_stats(anna).followers, 1)
+
+    def test_unknown_authors_are_skipped_without_flag(self):
+        posts = self.write_jsonl([{'author': 'ghost', 'text': 'Пост'}])
+        output = self.run_import('posts', posts)
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('пропущено 1', output)
+
+    def test_imported_content_reaches_timelines_and_thumbnail_queue(self):
+        anna = User.objects.create_user(username='anna')
+        boris = User.objects.create_user(username='boris')
+        Follow.objects.create(user=boris, author=anna)
+        posts = self.write_jsonl([
+            {'author': 'anna', 'text': 'С картинкой', 'image': 'posts/a.jpg'},
+            {'author': 'anna', 'text': 'Без картинки'},
+        ])
+        self.run_import('posts', posts)
+        self.assertEqual(
+            set(follow_posts(boris).values_list('text', flat=True)),
+            {'С картинкой', 'Без картинки'},
+        )
+        self.assertEqual(
+            list(ThumbnailJob.objects.values_list('post__text', flat=True)),
+            ['С картинкой'],
+        )
+
+        follows = self.write_file('.csv', 'user,author\nanna,boris\n')
+        Post.objects.create(author=boris, text='Старый пост')
+        self.run_import('follows', follows)
+        self.assertEqual(
+            list(follow_posts(anna).values_list('text', flat=True)),
+            ['Старый пост'],
+        )
+
+    def test_broken_record_keeps_written_batches_consistent(self):
+        """Пачки до битой строки записаны, и счётчики с лентами
+        обновлены для них.
+        """
+        anna = User.objects.create_user(username='anna')
+        boris = User.objects.create_user(username='boris')
+        Follow.objects.create(user=boris, author=anna)
+        Post.objects.create(author=anna, text='Свой пост')
+        posts = self.write_file('.jsonl', '\n'.join(
+            [json.dumps({'author': 'anna', 'text': f'Пост {i}'})
+             for i in range(2)] + ['{битая строка']
+        ))
+        with self.assertRaisesMessage(CommandError, 'записано 2'):
+            self.run_import('posts', posts)
+        self.assertEqual(get_stats(anna).posts, 3)
+        self.assertEqual(follow_posts(boris).count(), 3)
+
+    def test_broken_csv_is_reported(self):
+        too_long = 'x' * (csv.field_size_limit() + 1)
+        follows = self.write_file('.csv', f'user,author\n{too_long},anna\n')
+        with self.assertRaisesMessage(CommandError, 'записано 0'):
+            self.run_import('follows', follows)
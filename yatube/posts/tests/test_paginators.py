@@ -0,0 +1,200 @@
+from datetime import timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group
+from posts.paginators import (FORWARD, CursorPaginator, FeedPaginator,
+                              decode_cursor, pack)
+
+User = get_user_model()
+
+POSTS_COUNT = 25
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='cursor_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cursor_group', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Листание по курсору проходит всю ленту без пропусков и дублей."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(None)
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen.extend(page)
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        self.assertEqual(seen, expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.get_page(None)
+        second = paginator.get_page(first.next_cursor)
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        self.assertIsNone(decode_cursor('не-курсор'))
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page('не-курсор')
+        self.assertFalse(page.has_previous())
+        self.assertEqual(len(page), 10)
+
+    def test_equivalent_positions_share_cache_key(self):
+        """Ключ фрагмента строится по проверенной позиции, а не по строке
+        запроса: мусорные параметры не плодят копии страницы.
+        """
+        url = reverse('posts:index')
+
+        def key(params):
+            return self.client.get(url, params).context['cache_key']
+
+        self.assertEqual(key({}), key({'page': 'abc'}))
+        self.assertEqual(key({}), key({'page': '1'}))
+        self.assertEqual(key({'page': '3'}), key({'page': '999'}))
+        self.assertNotEqual(key({}), key({'page': '2'}))
+        self.assertEqual(
+            key({'cursor': ''}), key({'cursor': 'не-курсор'})
+        )
+        post = Post.objects.order_by('-pub_date', '-pk')[9]
+        utc = pack(FORWARD, post.pub_date.isoformat(), post.pk)
+        moscow = pack(
+            FORWARD,
+            post.pub_date.astimezone(timezone(timedelta(hours=3)))
+            .isoformat(),
+            post.pk,
+        )
+        self.assertEqual(key({'cursor': utc}), key({'cursor': moscow}))
+        self.assertNotEqual(key({'cursor': utc}), key({'cursor': ''}))
+
+    def test_feed_views_accept_cursor(self):
+        """Ленты переключаются в курсорный режим по параметру cursor."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={
+                'username': self.author.username}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': ''})
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.paginator.is_cursor)
+                self.assertEqual(len(page_obj), settings.PAGINATOR_PAGES)
+                self.assertContains(
+                    response, f'?cursor={page_obj.next_cursor}'
+                )
+
+    def test_cached_cursor_page_skips_page_query(self):
+        """Навигация по курсорам кэшируется вместе с постами: при
+        попадании в кэш страница ленты не читается.
+        """
+        url = reverse('posts:index')
+        first = self.client.get(url, {'cursor': ''})
+        next_cursor = first.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get(url, {'cursor': ''})
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'posts_post' in query['sql']
+        ])
+        self.assertContains(second, f'?cursor={next_cursor}')
+
+
+class FeedPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='feed_author')
+        self.group = Group.objects.create(title='Группа', slug='feed_group')
+        for i in range(POSTS_COUNT):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+        self.client = Client()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        counts = [
+            query for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        return response, len(counts)
+
+    def test_count_is_cached_until_feed_changes(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response, counts = self.count_queries(url)
+        self.assertEqual(counts, 1)
+        self.assertIs(type(response.context['page_obj']), Page)
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+        response, counts = self.count_queries(url)
+        self.assertEqual(counts, 0)
+        Post.objects.create(text='Новый', author=self.author, group=self.group)
+        response, counts = self.count_queries(url)
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context['page_obj'].paginator.count, 26)
+
+    def test_profile_uses_author_stats(self):
+        url = reverse('posts:profile', kwargs={'username': 'feed_author'})
+        self.count_queries(url)
+        response, counts = self.count_queries(url)
+        self.assertEqual(counts, 0)
+        self.assertEqual(response.context['page_obj'].paginator.count, 25)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_huge_feeds_use_estimate(self):
+        Post.objects.filter(text='Пост 0').delete()
+        response, counts = self.count_queries(reverse('posts:index'))
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(counts, 0)
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(paginator.count, Post.objects.latest('pk').pk)
+
+    @override_settings(PAGINATOR_ESTIMATE_THRESHOLD=10)
+    def test_estimate_hides_pages_past_the_end(self):
+        # Оценка по наибольшему id — 25 постов, на деле их 10.
+        oldest = Post.objects.order_by('pk')[:15].values_list('pk', flat=True)
+        Post.objects.filter(pk__in=list(oldest)).delete()
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.context['page_obj'].paginator.approximate)
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertNotContains(response, '?page=')
+        self.assertNotContains(response, 'Последняя')
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_links_are_elided(self):
+        paginator = FeedPaginator(Post.objects.all(), 1)
+        ellipsis = FeedPaginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(12)),
+            [1, 2, ellipsis, 9, 10, 11, 12, 13, 14, 15, ellipsis, 24, 25],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, ellipsis, 24, 25],
+        )
+        with self.settings(PAGINATOR_PAGES=1):
+            response = self.client.get(reverse('posts:index'), {'page': 12})
+        self.assertContains(response, ellipsis, count=2)
+        self.assertNotContains(response, '?page=5"')
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=self.author, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+        return post
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return len(context)
+
+    def test_feed_query_count_is_constant(self):
+        urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': self.author.username}),
+            'follow_index': reverse('posts:follow_index'),
+        }
+        self.add_posts(1)
+        single = {name: self.count_queries(url) for name, url in urls.items()}
+        self.add_posts(settings.PAGINATOR_PAGES)
+        for name, url in urls.items():
+            with self.subTest(view=name):
+                self.assertEqual(self.count_queries(url), single[name])
+
+    def test_post_detail_query_count_is_constant(self):
+        post = self.add_posts(1)
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        single = self.count_queries(url)
+        for i in range(10):
+            Comment.objects.create(post=post, author=self.author, text='Ещё')
+        self.assertEqual(self.count_queries(url), single)
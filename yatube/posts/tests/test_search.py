@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import filter_posts, match_expression, search
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.apple = Post.objects.create(
+            text='Яблоки и груши, яблоки и сливы', author=self.author
+        )
+        self.pear = Post.objects.create(
+            text='Только груши <b>здесь</b>', author=self.author
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Про яблоки номер {i}', author=self.author)
+            for i in range(12)
+        )
+
+    def test_ranked_results_with_highlight(self):
+        page = search('груши', 10)
+        self.assertEqual(set(page), {self.apple, self.pear})
+        pear = next(post for post in page if post == self.pear)
+        self.assertIn('<mark>груши</mark>', pear.snippet)
+        self.assertIn('&lt;b&gt;', pear.snippet)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        self.pear.text = 'Теперь про персики'
+        self.pear.save()
+        self.assertEqual(list(search('персики', 10)), [self.pear])
+        self.assertNotIn(self.pear, search('груши', 10))
+        self.pear.delete()
+        self.assertEqual(list(search('персики', 10)), [])
+
+    def test_keyset_pages_do_not_repeat(self):
+        first = search('яблоки', 10)
+        second = search('яблоки', 10, first.next_cursor)
+        self.assertTrue(first.has_next())
+        self.assertFalse(second.has_next())
+        self.assertEqual(len(first) + len(second), 13)
+        self.assertFalse(set(first) & set(second))
+
+    def test_user_input_is_escaped(self):
+        self.assertEqual(match_expression('"груши" OR *'), '"груши" "OR"*')
+        self.assertEqual(match_expression('!!!'), '')
+        self.assertEqual(len(search('NEAR(', 10)), 0)
+
+    def test_search_view_and_admin_filter(self):
+        response = Client().get(reverse('posts:search'), {'q': 'сливы'})
+        self.assertEqual(list(response.context['page_obj']), [self.apple])
+        self.assertEqual(
+            list(filter_posts(Post.objects.all(), 'сливы')), [self.apple]
+        )
@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+
+from posts import search
+from posts.models import AuthorStats, Comment, Follow, Post, TimelineEntry
+from posts.seeding import Seeder
+from posts.stats import COUNTERS, recompute
+
+User = get_user_model()
+
+SIZES = {'users': 60, 'groups': 5, 'posts': 400, 'comments': 300,
+         'follows': 400}
+
+
+def schema():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') ORDER BY name"
+        )
+        return [name for name, in cursor.fetchall()]
+
+
+class SeedDatasetTests(TestCase):
+    def seed(self, prefix, seed=7):
+        return Seeder(seed, prefix=prefix, batch_size=100).run(**SIZES)
+
+    def test_seeds_consistent_dataset(self):
+        before = schema()
+        written = self.seed('s')
+        self.assertEqual(schema(), before)
+        self.assertEqual(Post.objects.count(), SIZES['posts'])
+        self.assertEqual(Comment.objects.count(), SIZES['comments'])
+        self.assertEqual(Follow.objects.count(), written['follows'])
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        stored = {
+            stats.user_id: [getattr(stats, name) for name in COUNTERS]
+            for stats in AuthorStats.objects.all()
+        }
+        recompute(list(stored))
+        for stats in AuthorStats.objects.all():
+            self.assertEqual(
+                stored[stats.user_id],
+                [getattr(stats, name) for name in COUNTERS],
+            )
+        word = Post.objects.first().text.split()[1]
+        self.assertTrue(len(search.search(word, 100)))
+
+    def test_same_seed_gives_same_data(self):
+        def shape(prefix):
+            return [
+                (post.author.username[len(prefix):], post.group.slug[
+                    len(prefix):] if post.group else None, post.text)
+                for post in Post.objects.filter(
+                    author__username__startswith=prefix
+                ).select_related('author', 'group').order_by('pk')
+            ]
+        self.seed('a')
+        self.seed('b')
+        self.assertEqual(shape('a'), shape('b'))
+
+    def test_followers_follow_power_law(self):
+        self.seed('s')
+        followers = sorted(
+            AuthorStats.objects.values_list('followers', flat=True)
+        )
+        median = followers[len(followers) // 2]
+        self.assertGreater(followers[-1], 5 * max(median, 1))
+
+    def test_timelines_match_backfill(self):
+        with self.settings(TIMELINE_FANOUT_LIMIT=20):
+            self.seed('s')
+        for user in User.objects.all()[:10]:
+            authors = Follow.objects.filter(
+                user=user, author__stats__followers__lte=20
+            ).values('author_id')
+            expected = list(Post.objects.filter(
+                author_id__in=authors
+            ).order_by('-pub_date').values_list('pk', flat=True)[
+                :settings.TIMELINE_LENGTH
+            ])
+            actual = TimelineEntry.objects.filter(user=user).order_by(
+                '-pub_date'
+            ).values_list('post_id', flat=True)
+            self.assertEqual(list(actual), expected)
+
+    def test_command_refuses_existing_prefix(self):
+        out = StringIO()
+        call_command(
+            'seed_dataset', '--users', '10', '--posts', '20',
+            '--comments', '5', '--follows', '10', '--groups', '2',
+            stdout=out, stderr=StringIO(),
+        )
+        self.assertIn('posts 20', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('seed_dataset', stdout=out, stderr=StringIO())
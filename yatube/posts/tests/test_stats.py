@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models.signals import post_delete, post_save
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import AuthorStats, Comment, Follow, Post
+from posts.stats import get_stats
+
+User = get_user_model()
+
+
+class AuthorStatsTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        author_stats = get_stats(self.author)
+        reader_stats = get_stats(self.reader)
+        self.assertEqual(author_stats.posts, 2)
+        self.assertEqual(author_stats.followers, 1)
+        self.assertEqual(reader_stats.following, 1)
+        self.assertEqual(reader_stats.comments, 1)
+
+        post.delete()
+        follow.delete()
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts, 1)
+        self.assertEqual(author_stats.followers, 0)
+
+    def test_command_repairs_counters(self):
+        """recount_stats восстанавливает испорченные счётчики."""
+        Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Ещё пост', author=self.author)
+        AuthorStats.objects.filter(user=self.author).update(posts=100)
+        call_command('recount_stats', stdout=StringIO())
+        self.assertEqual(get_stats(self.author).posts, 2)
+
+    def test_missing_stats_are_rebuilt(self):
+        Post.objects.create(text='Пост', author=self.author)
+        AuthorStats.objects.all().delete()
+        self.assertEqual(get_stats(self.author).posts, 1)
+
+
+class CounterTransactionTests(TransactionTestCase):
+    def fail(self, **kwargs):
+        raise RuntimeError('Сбой после обновления счётчиков')
+
+    def failing(self, signal, sender):
+        # Подключается после обработчиков posts.signals и срабатывает
+        # уже после сдвига счётчиков.
+        signal.connect(self.fail, sender=sender)
+        self.addCleanup(signal.disconnect, self.fail, sender=sender)
+
+    def test_failed_write_rolls_back_counters(self):
+        """Запись и её счётчики фиксируются или откатываются вместе."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(text='Пост', author=author)
+        Follow.objects.create(user=reader, author=author)
+
+        self.failing(post_save, Post)
+        with self.assertRaises(RuntimeError):
+            Post.objects.create(text='Ещё пост', author=author)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(get_stats(author).posts, 1)
+
+        self.failing(post_save, Comment)
+        with self.assertRaises(RuntimeError):
+            Comment.objects.create(post=post, author=reader, text='Ответ')
+        self.assertEqual(get_stats(reader).comments, 0)
+
+        self.failing(post_delete, Follow)
+        with self.assertRaises(RuntimeError):
+            Follow.objects.get().delete()
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(get_stats(author).followers, 1)
+        self.assertEqual(get_stats(reader).following, 1)
@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from posts.management.commands.thumbnail_worker import MAX_ATTEMPTS
+from posts.models import Post, ThumbnailJob
+from posts.thumbnails import backend
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, text='Пост с картинкой'):
+        image = SimpleUploadedFile(
+            name='small.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        self.client.post(
+            reverse('posts:post_create'), {'text': text, 'image': image},
+        )
+        return Post.objects.get(text=text)
+
+    def index_queries(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('posts:index'))
+        return len(context)
+
+    def test_upload_enqueues_and_worker_generates(self):
+        """Картинка ставится в очередь, воркер строит миниатюру."""
+        post = self.create_post()
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+        detail = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertIsNone(
+            backend.get_ready_thumbnail(
+                post.image, '960x339', crop='center', upscale=True)
+        )
+        self.assertContains(self.client.get(detail), 'bg-light')
+
+        call_command(
+            'thumbnail_worker', '--once', '--processes', '1',
+            stdout=StringIO()
+        )
+        self.assertFalse(ThumbnailJob.objects.exists())
+        thumbnail = backend.get_ready_thumbnail(
+            post.image, '960x339', crop='center', upscale=True)
+        self.assertIsNotNone(thumbnail)
+        self.assertContains(self.client.get(detail), thumbnail.url)
+
+    def test_edit_without_new_image_does_not_enqueue(self):
+        post = self.create_post()
+        ThumbnailJob.objects.all().delete()
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Новый текст'},
+        )
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_saving_new_image_enqueues_outside_forms(self):
+        post = Post.objects.create(
+            author=self.user, text='Импорт', image='posts/a.gif'
+        )
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+        ThumbnailJob.objects.all().delete()
+        post.text = 'Правка'
+        post.save()
+        self.assertFalse(ThumbnailJob.objects.exists())
+        post.image = 'posts/b.gif'
+        post.save()
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+
+    def test_backfill_queues_missing_sizes_and_failed_jobs(self):
+        """--backfill достраивает новые размеры и повторяет упавшие задачи."""
+        worker = ('thumbnail_worker', '--once', '--processes', '1')
+        post = self.create_post()
+        call_command(*worker, stdout=StringIO())
+        failed = self.create_post('Упавший пост')
+        ThumbnailJob.objects.filter(post=failed).update(attempts=MAX_ATTEMPTS)
+        sizes = [('100x100', {'crop': 'center'}), *settings.POST_THUMBNAILS]
+        with self.settings(POST_THUMBNAILS=sizes):
+            call_command(*worker, stdout=StringIO())
+            self.assertTrue(ThumbnailJob.objects.exists())
+            call_command(*worker, '--backfill', stdout=StringIO())
+            self.assertFalse(ThumbnailJob.objects.exists())
+            for instance in (post, failed):
+                thumbnail = backend.get_ready_thumbnail(
+                    instance.image, '100x100', crop='center'
+                )
+                self.assertIsNotNone(thumbnail)
+            detail = reverse(
+                'posts:post_detail', kwargs={'post_id': failed.pk}
+            )
+            self.assertContains(self.client.get(detail), thumbnail.url)
+
+    def test_thumbnails_of_page_are_fetched_in_one_query(self):
+        """Метаданные всех миниатюр страницы читаются одним запросом."""
+        worker = ('thumbnail_worker', '--once', '--processes', '1')
+        self.create_post('Пост 0')
+        call_command(*worker, stdout=StringIO())
+        single = self.index_queries()
+        for i in range(1, 5):
+            self.create_post(f'Пост {i}')
+        call_command(*worker, stdout=StringIO())
+        self.assertEqual(self.index_queries(), single)
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.testing import commit_callbacks
+from posts import feed_cache
+from posts.models import AuthorStats, Follow, Post, TimelineEntry
+from posts.timeline import follow_posts
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+
+    def test_new_post_lands_in_follower_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with commit_callbacks():
+            post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertIn(post, follow_posts(self.reader))
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(3)
+        ]
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            set(follow_posts(self.reader)), set(posts)
+        )
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_timeline_is_trimmed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        with commit_callbacks():
+            for i in range(5):
+                Post.objects.create(text=f'Пост {i}', author=self.author)
+        self.assertEqual(self.reader.timeline.count(), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_live(self):
+        """Посты популярных авторов не копируются, а читаются из Post."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост звезды', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertIn(post, follow_posts(self.reader))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_posts_return_when_author_stops_being_celebrity(self):
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=other, author=self.author)
+        late = User.objects.create_user(username='late')
+        Follow.objects.create(user=late, author=self.author)
+        post = Post.objects.create(text='Пост звезды', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.get(user=late).delete()
+        self.assertIn(post, follow_posts(self.reader))
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_command_rebuilds_timelines_and_stats(self):
+        """Подписки и посты без лент и счётчиков, как до миграций 0010
+        и 0011, после rebuild_timelines видны в ленте подписок.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        TimelineEntry.objects.all().delete()
+        AuthorStats.objects.all().delete()
+        self.assertNotIn(post, follow_posts(self.reader))
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertIn(post, follow_posts(self.reader))
+        self.assertEqual(AuthorStats.objects.get(user=self.author).posts, 1)
+
+
+class CommitOrderTests(TransactionTestCase):
+    def test_fan_out_and_generations_follow_commit(self):
+        """Ленты и поколения меняются после фиксации поста: то, что
+        прочитано до неё, не остаётся под новым поколением.
+        """
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=reader, author=author)
+        with transaction.atomic():
+            post = Post.objects.create(text='Новый пост', author=author)
+            self.assertFalse(TimelineEntry.objects.exists())
+            during = feed_cache.generations('index')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertNotEqual(feed_cache.generations('index'), during)
@@ -10,6 +10,7 @@ from django.test import Client, TestCase, override_settings
 from django.core.cache import cache
 
 
+from core.testing import commit_callbacks
 from posts.models import Post, Group, Follow
 
 
@@ -100,11 +101,12 @@ class PostUrlTests(TestCase):
 
     def test_follower_have_new_record_and_not_follower_dont_have(self):
         Follow.objects.create(user=self.not_author, author=self.author)
-        self.post = Post.objects.create(
-            image=self.uploaded,
-            text='AAAAAAAAAAAAAAAAAAAAAAAA',
-            author=self.author,
-        )
+        with commit_callbacks():
+            self.post = Post.objects.create(
+                image=self.uploaded,
+                text='AAAAAAAAAAAAAAAAAAAAAAAA',
+                author=self.author,
+            )
         page_obj = self.authorized_client_not_author.get(
             reverse('posts:follow_index')).context['page_obj']
         foreign_page_obj = self.authorized_client_not_author2.get(
@@ -113,13 +115,9 @@ class PostUrlTests(TestCase):
         self.assertNotIn(self.post, foreign_page_obj)
 
     def test_cache(self):
-        posts_count = Post.objects.count()
         response = self.authorized_client.get(
             reverse('posts:index')).content
-        Post.objects.create(
-            text='text', author=self.author, group=self.group
-        )
-        self.assertEqual(Post.objects.count(), posts_count + 1)
+        Post.objects.filter(pk=self.post.pk).update(text='changed')
         self.assertEqual(
             response, self.authorized_client.get(
                 reverse('posts:index')).content)
@@ -128,6 +126,75 @@ class PostUrlTests(TestCase):
             response, self.authorized_client.get(
                 reverse('posts:index')).content)
 
+    def test_cache_invalidated_by_post_writes(self):
+        """Новый пост сразу виден на закэшированных лентах."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group_slug}),
+            reverse('posts:profile', kwargs={
+                'username': self.author.username}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            text='свежий пост', author=self.author, group=self.group
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'свежий пост'
+                )
+
+    def test_profile_cache_follows_group_changes(self):
+        """Переименование и удаление группы обновляют ссылки на неё
+        в закэшированном профиле автора.
+        """
+        url = reverse(
+            'posts:profile', kwargs={'username': self.author.username}
+        )
+        self.assertContains(
+            self.authorized_client.get(url), '/group/test_slug/'
+        )
+        self.group.slug = 'renamed'
+        self.group.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, '/group/renamed/')
+        self.assertNotContains(response, '/group/test_slug/')
+        self.group.delete()
+        self.assertNotContains(self.authorized_client.get(url), '/group/')
+
+    def test_cache_is_page_aware(self):
+        for i in range(settings.PAGINATOR_PAGES):
+            Post.objects.create(text=f'post {i}', author=self.author)
+        first = self.authorized_client.get(reverse('posts:index'))
+        second = self.authorized_client.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotEqual(first.content, second.content)
+
+    def test_pages_answer_not_modified(self):
+        """Повторный запрос с ETag получает 304 до изменения данных."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group_slug}),
+            reverse('posts:profile', kwargs={
+                'username': self.author.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        etag = self.authorized_client.get(urls[3])['ETag']
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'комментарий'})
+        response = self.authorized_client.get(
+            urls[3], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_pages_names = {
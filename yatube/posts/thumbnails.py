@@ -0,0 +1,96 @@
+from django.conf import settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import feed_cache
+from .models import Post, ThumbnailJob
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """ImageFile будущей миниатюры; имя считается так же, как в
+        get_thumbnail, без чтения исходной картинки.
+        """
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Как get_thumbnail, но без генерации: None, если миниатюры нет."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+    def prefetch(self, posts):
+        """Одним запросом подгружает метаданные миниатюр страницы."""
+        if not hasattr(default.kvstore, 'prefetch'):
+            return
+        default.kvstore.prefetch(
+            self.thumbnail_file(post.image, geometry, **options).key
+            for post in posts if post.image
+            for geometry, options in settings.POST_THUMBNAILS
+        )
+
+
+backend = ReadyThumbnailBackend()
+
+
+def enqueue(post):
+    ThumbnailJob.objects.update_or_create(post=post, defaults={'attempts': 0})
+
+
+def is_ready(post):
+    """Построены ли все миниатюры из POST_THUMBNAILS для картинки поста."""
+    return all(
+        backend.get_ready_thumbnail(post.image, geometry, **options)
+        for geometry, options in settings.POST_THUMBNAILS
+    )
+
+
+def backfill(batch_size=1000):
+    """Ставит в очередь посты с картинкой, у которых построены не все
+    миниатюры, например после смены POST_THUMBNAILS. Возвращает число
+    таких постов.
+    """
+    posts = Post.objects.exclude(image='').only('image').order_by('pk')
+    queued = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return queued
+        backend.prefetch(batch)
+        missing = [post.pk for post in batch if not is_ready(post)]
+        enqueue_many(missing)
+        queued += len(missing)
+        last_pk = batch[-1].pk
+
+
+def enqueue_many(post_ids):
+    """Ставит в очередь пачку постов; уже стоящие в ней не трогает."""
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(post_id=pk) for pk in post_ids),
+        batch_size=1000, ignore_conflicts=True,
+    )
+
+
+def generate(post_id):
+    """Строит миниатюры всех размеров из POST_THUMBNAILS."""
+    post = Post.objects.only('image', 'author', 'group').get(pk=post_id)
+    if not post.image:
+        return
+    for geometry, options in settings.POST_THUMBNAILS:
+        get_thumbnail(post.image, geometry, **options)
+    # Закэшированные фрагменты лент всё ещё показывают заглушку.
+    feed_cache.bump(*feed_cache.post_scopes(post))
@@ -0,0 +1,197 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (ExpressionWrapper, F, IntegerField, OuterRef,
+                              Q, Subquery)
+
+from . import follow_cache
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+# Пользователей на один INSERT ... SELECT в rebuild(): id идут
+# параметрами, а старые SQLite разрешают не больше 999 параметров.
+REBUILD_BATCH_SIZE = 500
+# Ленты пользователей, выбранных условием {users} по f.user_id: последние
+# TIMELINE_LENGTH постов авторов, как после backfill() каждой подписки.
+# Автор без строки AuthorStats считается обычным, как в is_celebrity().
+TIMELINE_SQL = (
+    'INSERT INTO {timeline} (user_id, post_id, pub_date) '
+    'SELECT user_id, post_id, pub_date FROM ('
+    'SELECT f.user_id, p.id AS post_id, p.pub_date, ROW_NUMBER() OVER ('
+    'PARTITION BY f.user_id ORDER BY p.pub_date DESC) AS position '
+    'FROM {follow} f '
+    'LEFT JOIN {stats} s ON s.user_id = f.author_id '
+    'JOIN {post} p ON p.author_id = f.author_id '
+    'WHERE {users} AND COALESCE(s.followers, 0) <= %s'
+    ') WHERE position <= %s'
+)
+
+
+def timeline_sql(users):
+    """TIMELINE_SQL для условия users; параметры — его значения,
+    затем TIMELINE_FANOUT_LIMIT и TIMELINE_LENGTH.
+    """
+    quote = connection.ops.quote_name
+    return TIMELINE_SQL.format(users=users, **{
+        name: quote(model._meta.db_table) for name, model in (
+            ('timeline', TimelineEntry), ('follow', Follow),
+            ('stats', AuthorStats), ('post', Post),
+        )
+    })
+
+
+def is_celebrity(author_id):
+    """Посты авторов с огромной аудиторией не раскладываются по лентам."""
+    return AuthorStats.objects.filter(
+        user_id=author_id, followers__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def trim(user_ids):
+    """Обрезает ленты пользователей до TIMELINE_LENGTH записей."""
+    boundary = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-pub_date').values('pub_date')[
+        settings.TIMELINE_LENGTH - 1:settings.TIMELINE_LENGTH
+    ]
+    TimelineEntry.objects.filter(
+        user_id__in=user_ids,
+        pub_date__lt=Subquery(boundary),
+    ).delete()
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Вызывается после фиксации поста, поэтому пост могли уже удалить.
+    """
+    if is_celebrity(post.author_id):
+        return
+    if not Post.objects.filter(pk=post.pk).exists():
+        return
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    with transaction.atomic():
+        for start in range(0, len(followers), BATCH_SIZE):
+            user_ids = followers[start:start + BATCH_SIZE]
+            TimelineEntry.objects.bulk_create(
+                (
+                    TimelineEntry(
+                        user_id=user_id, post=post, pub_date=post.pub_date
+                    )
+                    for user_id in user_ids
+                ),
+                ignore_conflicts=True,
+            )
+            trim(user_ids)
+
+
+def backfill(follow):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if is_celebrity(follow.author_id):
+        return
+    add_author_posts(follow.author_id, [follow.user_id])
+
+
+def add_author_posts(author_id, user_ids):
+    """Добавляет последние посты автора в ленты пользователей."""
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_LENGTH])
+    # Не больше BATCH_SIZE * 10 записей на пачку пользователей.
+    step = max(BATCH_SIZE * 10 // max(len(posts), 1), 1)
+    for start in range(0, len(user_ids), step):
+        batch = user_ids[start:start + step]
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                (
+                    TimelineEntry(user_id=user_id, post_id=pk, pub_date=date)
+                    for user_id in batch
+                    for pk, date in posts
+                ),
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            trim(batch)
+
+
+def restore(author_id):
+    """Раскладывает посты автора, который после отписки перестал быть
+    знаменитостью: пока он ей был, его посты не попадали в ленты,
+    а новые подписчики не получали backfill().
+    """
+    demoted = AuthorStats.objects.filter(
+        user_id=author_id, followers=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+    if not demoted:
+        return
+    add_author_posts(author_id, list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    ))
+
+
+def rebuild(user_ids):
+    """Заново строит ленты пользователей после массовых изменений,
+    которые обходят сигналы, например импорта.
+    """
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), REBUILD_BATCH_SIZE):
+        batch = user_ids[start:start + REBUILD_BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(batch))
+        sql = timeline_sql(f'f.user_id IN ({placeholders})')
+        with transaction.atomic(), connection.cursor() as cursor:
+            TimelineEntry.objects.filter(user_id__in=batch).delete()
+            cursor.execute(sql, [
+                *batch, settings.TIMELINE_FANOUT_LIMIT,
+                settings.TIMELINE_LENGTH,
+            ])
+
+
+def unfollow(follow):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+
+
+def follow_posts(user):
+    """Лента подписок: материализованная часть плюс живой запрос
+    по авторам, чьи посты не раскладываются по лентам.
+    """
+    followed = follow_cache.followed_ids(user.pk)
+    celebrities = []
+    for start in range(0, len(followed), BATCH_SIZE):
+        celebrities.extend(AuthorStats.objects.filter(
+            user_id__in=followed[start:start + BATCH_SIZE],
+            followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True))
+    return feed_posts(user, celebrities)
+
+
+def feed_posts(user, celebrities=()):
+    """Запрос ленты подписок user с постами знаменитостей celebrities.
+
+    Посты получают поля feed_date и feed_id, по которым лента
+    упорядочена и листается FollowPaginator.
+    """
+    if not celebrities:
+        # Дата и id берутся из записи ленты: порядок совпадает
+        # с индексом (user, -pub_date, -post) и сортировка не нужна.
+        return Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_date=F('timeline_entries__pub_date'),
+            feed_id=F('timeline_entries__post_id'),
+        ).order_by('-feed_date', '-feed_id')
+    materialized = TimelineEntry.objects.filter(user=user).values('post_id')
+    # Условия на выражениях + 0 не используют индексы: иначе SQLite
+    # собирает посты по индексам обеих частей OR и сортирует их
+    # во временном B-дереве, а так читает посты по индексу дат.
+    return Post.objects.annotate(
+        feed_date=F('pub_date'),
+        feed_id=F('pk'),
+        feed_post=ExpressionWrapper(F('pk') + 0, IntegerField()),
+        feed_author=ExpressionWrapper(F('author_id') + 0, IntegerField()),
+    ).filter(
+        Q(feed_post__in=materialized) | Q(feed_author__in=celebrities)
+    ).order_by('-feed_date', '-feed_id')
@@ -1,63 +1,176 @@
 from django.shortcuts import get_object_or_404, render
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition
 
-from .models import Post, Group, Follow
+from core.replicas import replica_reads
+
+from . import feed_cache
+from .exporting import export_jsonl, export_zip
+from .follow_cache import is_following
+from .models import Comment, Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .paginators import (CommentPaginator, CursorPaginator, FeedPaginator,
+                         FollowPaginator, normalize_cursor)
+from .search import search
+from .stats import get_stats
+from .timeline import follow_posts
 
 User = get_user_model()
 
 
-def paginator_view(request, post_list):
-    paginator = Paginator(post_list, settings.PAGINATOR_PAGES)
+def paginator_view(request, post_list, *scopes, count=None, estimate=None,
+                   cursor_class=CursorPaginator):
+    if 'cursor' in request.GET:
+        paginator = cursor_class(post_list, settings.PAGINATOR_PAGES)
+        # Страница читается при первом обращении. Навигация по курсорам
+        # отрисовывается внутри {% cache %} вместе с постами, поэтому
+        # при попадании в кэш запроса страницы нет вовсе.
+        return SimpleLazyObject(
+            lambda: paginator.get_page(request.GET.get('cursor'))
+        )
+    paginator = FeedPaginator(
+        post_list, settings.PAGINATOR_PAGES, scopes,
+        count=count, estimate=estimate,
+    )
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)
 
 
+def cache_key(request, page_obj, *scopes):
+    """Ключ фрагмента страницы ленты по проверенной позиции: номеру
+    страницы или каноническому курсору. Курсорная страница при этом
+    не читается.
+    """
+    if 'cursor' in request.GET:
+        position = 'cursor:' + normalize_cursor(request.GET['cursor'])
+    else:
+        position = f'page:{page_obj.number}'
+    return feed_cache.key(position, *scopes)
+
+
+def index_etag(request):
+    return feed_cache.etag(request, 'index')
+
+
+def group_etag(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        return None
+    return feed_cache.etag(request, f'group:{group_id}')
+
+
+def profile_etag(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        return None
+    return feed_cache.etag(request, f'profile:{author_id}')
+
+
+def post_etag(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id').first()
+    if post is None:
+        return None
+    author_id, group_id = post
+    return feed_cache.etag(
+        request, f'post:{post_id}', f'profile:{author_id}',
+        f'group:{group_id}'
+    )
+
+
+def follow_etag(request):
+    return feed_cache.etag(request, 'index', f'follow:{request.user.pk}')
+
+
+@replica_reads
+@condition(etag_func=index_etag)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.PAGINATOR_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.for_feed()
+    page_obj = paginator_view(
+        request, post_list, 'index',
+        estimate=Post.objects.estimated_count,
+    )
     context = {
         'page_obj': page_obj,
+        'cache_key': cache_key(request, page_obj, 'index'),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.PAGINATOR_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = group.posts.for_feed()
+    page_obj = paginator_view(request, post_list, f'group:{group.pk}')
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'cache_key': cache_key(request, page_obj, f'group:{group.pk}'),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@condition(etag_func=profile_etag)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    posts = user.posts.all()
-    paginator = Paginator(posts, settings.PAGINATOR_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    count = Post.objects.filter(author=user).count()
-    following = user.is_authenticated and user.following.exists()
+    posts = user.posts.for_feed()
+    count = get_stats(user).posts
+    page_obj = paginator_view(request, posts, count=count)
+    following = is_following(request.user, [user])[user.pk]
     context = {
         'author': user,
         'count': count,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'cache_key': cache_key(request, page_obj, f'profile:{user.pk}'),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        return redirect('posts:profile', username=username)
+    if request.GET.get('format') == 'zip':
+        response = StreamingHttpResponse(
+            export_zip(author), content_type='application/zip'
+        )
+        filename = f'{author.username}.zip'
+    else:
+        response = StreamingHttpResponse(
+            export_jsonl(author), content_type='application/x-ndjson'
+        )
+        filename = f'{author.username}.jsonl'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@replica_reads
+def post_search(request):
+    query = request.GET.get('q', '')
+    page_obj = search(
+        query, settings.PAGINATOR_PAGES, request.GET.get('cursor')
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -70,20 +183,42 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    count = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id
+    )
+    count = get_stats(post.author).posts
     form = CommentForm(request.POST or None)
     context = {
         'count': count,
         'post': post,
         'form': form,
-        'comments': post.comments.all()
+        'comments': comment_page(post.pk, None),
     }
 
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_page(post_id, cursor):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post_id', 'author__username')
+    paginator = CommentPaginator(comments, settings.COMMENTS_PAGE)
+    return paginator.get_page(cursor)
+
+
+@replica_reads
+@condition(etag_func=post_etag)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на post_detail."""
+    context = {
+        'post_id': post_id,
+        'comments': comment_page(post_id, request.GET.get('cursor')),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method == "POST":
@@ -120,12 +255,22 @@ def post_edit(request, post_id):
 
 
 @login_required
+@replica_reads
+@condition(etag_func=follow_etag)
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts_list, settings.PAGINATOR_PAGES)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+    posts_list = follow_posts(request.user).for_feed()
+    page_obj = paginator_view(
+        request, posts_list, 'index', f'follow:{request.user.pk}',
+        cursor_class=FollowPaginator,
+    )
+    context = {
+        'page_obj': page_obj,
+        'cache_key': cache_key(
+            request, page_obj, 'index', f'follow:{request.user.pk}'
+        ),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
+    return render(request, 'posts/follow.html', context)
 
 
 @login_required
@@ -30,7 +30,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.slow_queries.SlowQueryMiddleware',
+    'core.timing.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -40,10 +44,12 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'yatube.urls'
+# Тесты работают с временным каталогом кэша, см. core.testing.
+TEST_RUNNER = 'core.testing.TestRunner'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,9 +71,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами: прагмы не выполняются
+        # заново на каждый запрос.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Прагмы для каждого SQLite-соединения; у отдельной базы их можно
+# дополнить ключом PRAGMAS в DATABASES. WAL не блокирует читателей
+# на время записи, busy_timeout даёт писателям дождаться друг друга.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+# Псевдонимы реплик только для чтения из DATABASES. Для локальной проверки
+# подойдут копии SQLite, их обновляет manage.py sync_replicas.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+REPLICA_APPS = ['posts']
+REPLICA_PIN_SECONDS = 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,11 +138,66 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 PAGINATOR_PAGES = 10
+PAGINATOR_ESTIMATE_THRESHOLD = 100000
+COMMENTS_PAGE = 20
+
+TIMELINE_LENGTH = 800
+TIMELINE_FANOUT_LIMIT = 5000
+
+FOLLOW_CACHE_TIMEOUT = 60 * 60
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+
+# Размеры, которые заранее строит thumbnail_worker; первый показывают
+# карточки постов.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_TIMEOUT = 60 * 5
+THUMBNAIL_MISS_TIMEOUT = 30
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Доля запросов, замеряемых для журнала core.timing; заголовок
+# Server-Timing из них получают только сотрудники.
+SERVER_TIMING_SAMPLE_RATE = 0.01
+
+# Метрики каждого процесса сбрасываются в свой файл не чаще раза
+# в METRICS_FLUSH_INTERVAL секунд; /metrics/ складывает все файлы,
+# а файлы завершившихся процессов сводит в один.
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+
+# Запросы к базе дольше стольких секунд попадают в сводку медленных
+# запросов с планом; None выключает запись.
+SLOW_QUERY_THRESHOLD = 0.2
+
+# LRU в памяти процесса перед файловым кэшем, общим для всех воркеров.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TwoTierCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'SHARED_BACKEND': 'core.cache.FileBasedCache',
+            'LRU_SIZE': 1000,
+            'LRU_TIMEOUT': 5,
+            'GENERATION_INTERVAL': 1.0,
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Фрагменты {% cache %} и cached() в представлениях: один пересчёт
+    # на ключ, старое значение на время пересчёта.
+    'template_fragments': {
+        'BACKEND': 'core.stampede.StampedeCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'STALE': 60,
+            'BETA': 1.0,
+            'LOCK_TIMEOUT': 10,
+            'WAIT': 2.0,
+        },
+    },
 }